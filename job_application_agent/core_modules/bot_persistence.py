@@ -0,0 +1,170 @@
+import os
+import sqlite3
+from typing import Any, Dict, Optional, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from job_application_agent import config
+from job_application_agent.core_modules.error_handler import DataStorageError, get_logger
+from job_application_agent.utils import json_dumps, json_loads
+
+logger = get_logger(__name__)
+
+_DEFAULT_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data') # Fallback if config is missing
+_DB_FILENAME = "bot_state.db"
+
+# --- Schema ---
+# One row per user holding their whole user_data dict as JSON (it is only ever read or replaced as a whole),
+# and one row per active conversation. Conversation keys are tuples of chat/user ids, stored as a JSON array.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (
+    user_id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS conversations (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    state BLOB NOT NULL,
+    PRIMARY KEY (name, key)
+);
+"""
+_UPSERT_USER_DATA_SQL = "INSERT INTO user_data (user_id, data) VALUES (?, ?) ON CONFLICT (user_id) DO UPDATE SET data = excluded.data"
+_UPSERT_CONVERSATION_SQL = (
+    "INSERT INTO conversations (name, key, state) VALUES (?, ?, ?) "
+    "ON CONFLICT (name, key) DO UPDATE SET state = excluded.state"
+)
+
+
+def default_db_path() -> str:
+    """The database file used when none is given: TELEGRAM_PERSISTENCE_PATH, else bot_state.db in DATA_STORAGE_PATH."""
+    return getattr(config, 'TELEGRAM_PERSISTENCE_PATH', None) or os.path.join(
+        getattr(config, 'DATA_STORAGE_PATH', _DEFAULT_DATA_PATH), _DB_FILENAME
+    )
+
+
+class SqlitePersistence(BasePersistence):
+    """
+    Keeps the bot's user_data and ConversationHandler states in a SQLite database, so users can pick up
+    where they left off after the bot restarts. Values are stored as JSON (orjson when installed), so
+    user_data must hold JSON-serializable values only. chat_data, bot_data and callback_data are not stored.
+
+    All methods run on the event loop: each write is a single small autocommit statement, and with WAL
+    mode and synchronous=NORMAL a commit does not wait for the disk.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, update_interval: float = 60):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval
+        )
+        self.db_path = db_path or default_db_path()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Opens the database (creating it and its schema if needed) on first use."""
+        if self._conn is None:
+            logger.debug("Opening bot persistence database: %s", self.db_path)
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+                conn = sqlite3.connect(self.db_path, isolation_level=None) # Autocommit
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(_SCHEMA)
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"Failed to open bot persistence database {self.db_path}: {e}", exc_info=True)
+                raise DataStorageError(f"Failed to open database {self.db_path}: {e}")
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql: str, params: Tuple[Any, ...] = ()) -> sqlite3.Cursor:
+        try:
+            return self._connection().execute(sql, params)
+        except sqlite3.Error as e:
+            logger.error(f"Bot persistence query failed: {e}", exc_info=True)
+            raise DataStorageError(f"Bot persistence query failed: {e}")
+
+    # --- user_data ---
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        return {user_id: json_loads(data) for user_id, data in self._execute("SELECT user_id, data FROM user_data")}
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        self._execute(_UPSERT_USER_DATA_SQL, (user_id, json_dumps(data)))
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._execute("DELETE FROM user_data WHERE user_id = ?", (user_id,))
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        pass # This process is the only writer, so the in-memory copy is always current
+
+    # --- Conversations ---
+    async def get_conversations(self, name: str) -> Dict[Tuple[int, ...], object]:
+        rows = self._execute("SELECT key, state FROM conversations WHERE name = ?", (name,))
+        return {tuple(json_loads(key)): json_loads(state) for key, state in rows}
+
+    async def update_conversation(self, name: str, key: Tuple[int, ...], new_state: Optional[object]) -> None:
+        encoded_key = json_dumps(list(key)).decode('utf-8')
+        if new_state is None: # The conversation ended
+            self._execute("DELETE FROM conversations WHERE name = ? AND key = ?", (name, encoded_key))
+        else:
+            self._execute(_UPSERT_CONVERSATION_SQL, (name, encoded_key, json_dumps(new_state)))
+
+    # --- Not stored (see store_data) ---
+    async def get_chat_data(self) -> Dict[int, Any]:
+        return {}
+
+    async def update_chat_data(self, chat_id: int, data: Any) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Any) -> None:
+        pass
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        return {}
+
+    async def update_bot_data(self, data: Any) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Any) -> None:
+        pass
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def update_callback_data(self, data: Any) -> None:
+        pass
+
+    async def flush(self) -> None:
+        """Called by the Application on shutdown, after the final updates; closes the database."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# --- Example Usage (for testing) ---
+if __name__ == '__main__':
+    import asyncio
+    import tempfile
+
+    async def main_test():
+        print("--- bot_persistence.py standalone test ---")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, _DB_FILENAME)
+            persistence = SqlitePersistence(db_path)
+            await persistence.update_user_data(42, {"cv_analysis": {"skills": ["Python"]}, "answers": [None, "Remote"]})
+            await persistence.update_conversation("cv_onboarding", (42, 42), 2)
+            await persistence.flush()
+
+            reopened = SqlitePersistence(db_path) # As after a restart
+            assert await reopened.get_user_data() == {42: {"cv_analysis": {"skills": ["Python"]}, "answers": [None, "Remote"]}}
+            assert await reopened.get_conversations("cv_onboarding") == {(42, 42): 2}
+            await reopened.update_conversation("cv_onboarding", (42, 42), None)
+            await reopened.drop_user_data(42)
+            assert await reopened.get_conversations("cv_onboarding") == {}
+            assert await reopened.get_user_data() == {}
+            await reopened.flush()
+        print("--- bot_persistence.py standalone test complete ---")
+
+    asyncio.run(main_test())
@@ -1,25 +1,397 @@
 import os
 import io
-from PyPDF2 import PdfReader # PyPDF2 is the successor to PyPDF; ensure it's in requirements.txt
-import docx # python-docx library
-
+import hashlib
+import importlib
+import logging
+import time
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+# The PDF backend (pypdfium2, else PyMuPDF/PyPDF2) and lxml (DOCX) are imported inside the extractors that
+# use them, so importing this module doesn't pay for a parser the process never needs.
+# pypdfium2 and lxml must be in requirements.txt.
+
+from job_application_agent import config
 from job_application_agent.core_modules.error_handler import CVParserError, get_logger
 
 logger = get_logger(__name__)
 
+# --- Parsed Text Cache ---
+# Extracted text is cached under a BLAKE2b fingerprint of the file bytes, the extension and everything else that
+# shapes the result (cache format version, size limits, PDF backend), so a CV that is re-sent or re-submitted is
+# not parsed again, and changing a limit or backend never serves text extracted under the old settings.
+# Hot keys are served from a small in-process LRU. CV text is personal data, so the on-disk cache is opt-in
+# (CV_PARSER_CACHE_DIR in config.py) and bounded: files expire after CV_PARSER_CACHE_TTL_SECONDS, and only the
+# newest CV_PARSER_CACHE_MAX_FILES are kept.
+_CACHE_FORMAT_VERSION = 3 # 3: line endings normalized to "\n"
+_CACHE_DIR = getattr(config, 'CV_PARSER_CACHE_DIR', None) # None: memory cache only
+_CACHE_TTL_SECONDS = getattr(config, 'CV_PARSER_CACHE_TTL_SECONDS', 7 * 24 * 60 * 60)
+_CACHE_MAX_FILES = getattr(config, 'CV_PARSER_CACHE_MAX_FILES', 1000)
+_MEMORY_CACHE_MAX_ENTRIES = 128
+_memory_cache: "OrderedDict[str, str]" = OrderedDict()
+_HASH_CHUNK_SIZE = 64 * 1024
+
+
+def _extraction_settings(file_extension: str) -> bytes:
+    """Everything besides the file contents that affects the extracted text, for the cache key."""
+    backend = '+'.join(_get_pdf_backends()) if file_extension == '.pdf' else '' # Fallbacks can produce the text too
+    return f"{_CACHE_FORMAT_VERSION}:{_MAX_CV_PAGES}:{_MAX_CV_CHARS}:{backend}".encode('ascii')
+
+
+def _content_key(file_stream, file_extension: str) -> str:
+    """Fingerprints the full contents of a binary stream (and the extraction settings) and leaves it positioned at the start."""
+    digest = hashlib.blake2b(_extraction_settings(file_extension), digest_size=16)
+    if isinstance(file_stream, io.BytesIO):
+        with file_stream.getbuffer() as view: # Hash the underlying buffer without copying it
+            digest.update(view)
+    else:
+        file_stream.seek(0)
+        for chunk in iter(lambda: file_stream.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    file_stream.seek(0)
+    return digest.hexdigest() + file_extension
+
+
+def _is_seekable(file_stream) -> bool:
+    """Checks whether a file-like object supports random access (needed for fingerprinting and parsing)."""
+    seekable = getattr(file_stream, 'seekable', None)
+    if seekable is not None:
+        return seekable()
+    return hasattr(file_stream, 'seek') and hasattr(file_stream, 'tell')
+
+
+def _cache_get(key: str):
+    """Returns cached text for key, or None on a miss. Cache read failures are treated as misses."""
+    cached_text = _memory_cache.get(key)
+    if cached_text is not None:
+        _memory_cache.move_to_end(key)
+        return cached_text
+    if not _CACHE_DIR:
+        return None
+
+    cache_file = os.path.join(_CACHE_DIR, f"{key}.txt")
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            if time.time() - os.fstat(f.fileno()).st_mtime > _CACHE_TTL_SECONDS:
+                expired = True
+            else:
+                expired = False
+                cached_text = f.read()
+        if expired:
+            os.remove(cache_file)
+            return None
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.warning(f"Could not read CV parser cache file {cache_file}: {e}")
+        return None
+
+    _remember(key, cached_text)
+    return cached_text
+
+
+def _cache_put(key: str, text: str) -> None:
+    """Stores text in the memory cache and, if enabled, the disk cache. The disk write is atomic (temp file + rename)."""
+    _remember(key, text)
+    if not _CACHE_DIR:
+        return
+
+    cache_file = os.path.join(_CACHE_DIR, f"{key}.txt")
+    tmp_file = f"{cache_file}.tmp"
+    try:
+        os.makedirs(_CACHE_DIR, mode=0o700, exist_ok=True)
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_file, cache_file)
+        _prune_disk_cache()
+    except OSError as e:
+        # The cache is an optimization only; parsing already succeeded.
+        logger.warning(f"Could not write CV parser cache file {cache_file}: {e}")
+
+
+def _prune_disk_cache() -> None:
+    """Deletes expired cache files, then the oldest ones beyond _CACHE_MAX_FILES."""
+    now = time.time()
+    entries = []
+    with os.scandir(_CACHE_DIR) as it:
+        for entry in it:
+            if not entry.name.endswith(".txt"):
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+                if now - mtime > _CACHE_TTL_SECONDS:
+                    os.remove(entry.path)
+                else:
+                    entries.append((mtime, entry.path))
+            except OSError: # Removed concurrently
+                pass
+    if len(entries) > _CACHE_MAX_FILES:
+        entries.sort()
+        for _, path in entries[:len(entries) - _CACHE_MAX_FILES]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _remember(key: str, text: str) -> None:
+    """Inserts into the in-process LRU, evicting the least recently used entry when full."""
+    _memory_cache[key] = text
+    _memory_cache.move_to_end(key)
+    if len(_memory_cache) > _MEMORY_CACHE_MAX_ENTRIES:
+        _memory_cache.popitem(last=False)
+
+
+# --- PDF Backend ---
+# Text extraction prefers a native engine: PDFium (pypdfium2), then MuPDF (PyMuPDF). PyPDF2's pure-Python
+# tokenizer is only a last resort when neither is installed. The installed backends are resolved once, on the
+# first PDF. PDFium is stricter than PyPDF2 about malformed files (e.g. a broken cross-reference table), so a
+# document the preferred backend can't load is retried with the next installed one before giving up.
+_PDF_BACKENDS = (('pdfium', 'pypdfium2'), ('mupdf', 'fitz'), ('pypdf2', 'PyPDF2'))
+_INSTALLED_PDF_BACKENDS = None
+
+
+def _get_pdf_backends() -> tuple:
+    """Returns (resolving them once) the installed PDF libraries from _PDF_BACKENDS, most preferred first."""
+    global _INSTALLED_PDF_BACKENDS
+    if _INSTALLED_PDF_BACKENDS is None:
+        installed = []
+        for backend, module_name in _PDF_BACKENDS:
+            try:
+                importlib.import_module(module_name)
+            except ImportError:
+                continue
+            installed.append(backend)
+        if not installed:
+            raise CVParserError("No PDF library available. Install pypdfium2 (recommended), PyMuPDF or PyPDF2.")
+        _INSTALLED_PDF_BACKENDS = tuple(installed)
+        logger.info(f"Using '{installed[0]}' for PDF text extraction (fallbacks: {', '.join(installed[1:]) or 'none'}).")
+    return _INSTALLED_PDF_BACKENDS
+
+
+def _open_pdf(backend: str, file_stream):
+    """
+    Opens a PDF stream with the given backend and returns (document, page count).
+    Returns (None, 0) for a PDF that can't be opened without a password (encryption with an empty
+    user password, common for "no copy/print" restrictions, still opens normally).
+    """
+    if backend == 'pdfium':
+        import pypdfium2
+        try:
+            pdf = pypdfium2.PdfDocument(file_stream)
+        except pypdfium2.PdfiumError as e:
+            if e.err_code == pypdfium2.raw.FPDF_ERR_PASSWORD:
+                return None, 0
+            raise
+        return pdf, len(pdf)
+    if backend == 'mupdf':
+        import fitz
+        file_stream.seek(0)
+        pdf = fitz.open(stream=file_stream.read(), filetype='pdf')
+        if pdf.needs_pass:
+            pdf.close()
+            return None, 0
+        return pdf, pdf.page_count
+    import PyPDF2
+    pdf = PyPDF2.PdfReader(file_stream)
+    if pdf.is_encrypted:
+        try:
+            if not pdf.decrypt(""):
+                return None, 0
+        except Exception: # e.g. AES encryption without the optional crypto dependency
+            return None, 0
+    return pdf, len(pdf.pages)
+
+
+def _open_pdf_with_fallback(file_stream):
+    """
+    Opens a PDF stream with the preferred backend, moving on to the next installed backend if one can't
+    load the document. Returns (backend, document, page count); the document is None for a password-protected
+    PDF (see _open_pdf). Raises the last backend's error if none of them can load it.
+    """
+    backends = _get_pdf_backends()
+    for i, backend in enumerate(backends):
+        file_stream.seek(0)
+        try:
+            pdf, n_pages = _open_pdf(backend, file_stream)
+        except Exception as e:
+            if i == len(backends) - 1:
+                raise
+            logger.warning(f"PDF backend '{backend}' could not load the document ({e}); trying '{backends[i + 1]}'.")
+            continue
+        return backend, pdf, n_pages
+
+
+def _close_pdf(backend: str, pdf) -> None:
+    """Releases a document opened by _open_pdf (PyPDF2 readers hold no native resources)."""
+    if backend != 'pypdf2':
+        pdf.close()
+
+
+def _page_text(backend: str, pdf, page_num: int) -> str:
+    """Extracts the text of one page with the given backend."""
+    if backend == 'pdfium':
+        page = pdf[page_num]
+        text_page = page.get_textpage()
+        try:
+            return text_page.get_text_range()
+        finally:
+            text_page.close()
+            page.close()
+    if backend == 'mupdf':
+        return pdf[page_num].get_text()
+    return pdf.pages[page_num].extract_text()
+
+
+def _page_has_text_objects(backend: str, pdf, page_num: int) -> bool:
+    """Checks whether a page has any text drawing objects (or, for PyPDF2/MuPDF, any fonts in its resources)."""
+    if backend == 'pdfium':
+        import pypdfium2
+        page = pdf[page_num]
+        try:
+            return next(page.get_objects(filter=(pypdfium2.raw.FPDF_PAGEOBJ_TEXT,)), None) is not None
+        finally:
+            page.close()
+    if backend == 'mupdf':
+        return bool(pdf[page_num].get_fonts())
+    page = pdf.pages[page_num]
+    return '/Resources' in page and '/Font' in page['/Resources']
+
+
+# Scanned CVs have no text layer at all. If none of the first few pages has any text, the document is
+# treated as image-based and the full per-page extraction pass is skipped.
+_TEXT_PROBE_PAGES = 3
+
+
+def _looks_image_only(backend: str, pdf, n_pages: int) -> bool:
+    """Returns True when none of the first _TEXT_PROBE_PAGES pages carries text. Probe failures count as text."""
+    try:
+        return not any(_page_has_text_objects(backend, pdf, i) for i in range(min(_TEXT_PROBE_PAGES, n_pages)))
+    except Exception as e:
+        logger.warning(f"Could not check PDF pages for text, running full extraction: {e}")
+        return False
+
+
+# --- Size Limits ---
+# A CV is a few pages; anything far beyond that (a whole portfolio, a thesis) would only slow parsing down and
+# blow up the LLM prompt. Extraction stops after MAX_CV_PAGES PDF pages or about MAX_CV_CHARS characters of DOCX
+# text, and the extracted text of any CV is cut at MAX_CV_CHARS.
+_MAX_CV_PAGES = getattr(config, 'MAX_CV_PAGES', 20)
+_MAX_CV_CHARS = getattr(config, 'MAX_CV_CHARS', 100_000)
+
+
+# --- PDF Page Extraction ---
+# PDFs with at least this many pages are split across worker processes (pages are independent).
+# PDFium handles a page in milliseconds, so for typical 1-3 page CVs the worker start-up cost would dominate.
+# Callers that already run parse_cv in their own worker processes turn this off with
+# disable_parallel_page_extraction(), so each of their workers doesn't start (and leak) a pool of its own.
+_PARALLEL_MIN_PAGES = 8
+_parallel_pages = True
+_page_pool = None
+
+
+def disable_parallel_page_extraction() -> None:
+    """Extracts all PDF pages in the calling process from now on (e.g. as a process pool initializer)."""
+    global _parallel_pages
+    _parallel_pages = False
+
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    """Lazily creates the worker pool shared by all parallel PDF extractions."""
+    global _page_pool
+    if _page_pool is None:
+        _page_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _page_pool
+
+
+def _extract_pages(backend: str, pdf, start: int, stop: int, buf: io.StringIO) -> bool:
+    """
+    Writes the text of pages [start, stop) of an open PDF to buf, one page per line.
+    Returns whether any of those pages had non-whitespace text.
+    """
+    has_text = False
+    warn_enabled = logger.isEnabledFor(logging.WARNING) # Checked once, not per failing page
+    for page_num in range(start, stop):
+        try:
+            text = _page_text(backend, pdf, page_num) or "" # Ensure None is handled
+        except Exception as e:
+            if warn_enabled:
+                logger.warning("Could not extract text from page %d of PDF: %s", page_num + 1, e)
+            text = "" # Pages that fail extraction still get their (empty) line
+        if page_num > start:
+            buf.write("\n")
+        buf.write(text)
+        if not has_text and text and not text.isspace():
+            has_text = True
+    return has_text
+
+
+def _extract_pages_worker(args: tuple) -> tuple:
+    """Process pool entry point: opens the PDF from raw bytes and extracts one page range as (text, has_text)."""
+    backend, pdf_bytes, start, stop = args
+    pdf, _ = _open_pdf(backend, io.BytesIO(pdf_bytes))
+    try:
+        buf = io.StringIO()
+        has_text = _extract_pages(backend, pdf, start, stop, buf)
+        return buf.getvalue(), has_text
+    finally:
+        _close_pdf(backend, pdf)
+
+
+def _extract_pages_in_parallel(backend: str, pdf_bytes: bytes, n_pages: int) -> tuple:
+    """Splits the pages into one contiguous range per worker, extracts them concurrently and returns (text, has_text)."""
+    n_workers = min(os.cpu_count() or 1, n_pages)
+    range_size = -(-n_pages // n_workers) # Ceiling division
+    page_ranges = [
+        (backend, pdf_bytes, start, min(start + range_size, n_pages)) for start in range(0, n_pages, range_size)
+    ]
+    buf = io.StringIO()
+    has_text = False
+    for i, (range_text, range_has_text) in enumerate(_get_page_pool().map(_extract_pages_worker, page_ranges)):
+        if i:
+            buf.write("\n")
+        buf.write(range_text)
+        has_text = has_text or range_has_text
+    return buf.getvalue(), has_text
+
+
 def _extract_text_from_pdf(file_stream: io.BytesIO) -> str:
     """Extracts text from a PDF file stream."""
     try:
-        pdf_reader = PdfReader(file_stream)
-        text_parts = []
-        for page_num, page in enumerate(pdf_reader.pages):
-            try:
-                text_parts.append(page.extract_text() or "") # Ensure None is handled
-            except Exception as e:
-                logger.warning(f"Could not extract text from page {page_num + 1} of PDF: {e}")
-                text_parts.append("") # Add empty string for pages that fail extraction
-        full_text = "\n".join(text_parts)
-        if not full_text.strip():
+        backend, pdf, n_pages = _open_pdf_with_fallback(file_stream)
+        if pdf is None:
+            logger.warning("PDF is password-protected; skipping text extraction.")
+            return ""
+        try:
+            if _looks_image_only(backend, pdf, n_pages):
+                logger.warning("PDF has no text layer on its first pages (image-based, e.g. a scan); skipping text extraction.")
+                return ""
+            if n_pages > _MAX_CV_PAGES:
+                logger.warning(f"PDF has {n_pages} pages; extracting only the first {_MAX_CV_PAGES}.")
+                n_pages = _MAX_CV_PAGES
+            full_text = None
+            if n_pages == 1: # Most CVs: no buffer or page loop needed
+                try:
+                    full_text = _page_text(backend, pdf, 0) or ""
+                except Exception as e:
+                    logger.warning("Could not extract text from page 1 of PDF: %s", e)
+                    full_text = ""
+                has_text = bool(full_text) and not full_text.isspace()
+            elif _parallel_pages and n_pages >= _PARALLEL_MIN_PAGES:
+                try:
+                    file_stream.seek(0)
+                    full_text, has_text = _extract_pages_in_parallel(backend, file_stream.read(), n_pages)
+                except Exception as e:
+                    # e.g. BrokenProcessPool; the PDF itself is fine, so fall back to in-process extraction.
+                    logger.warning(f"Parallel PDF extraction failed, extracting {n_pages} pages sequentially: {e}")
+            if full_text is None:
+                # Pages are written straight into one growing buffer rather than kept as a list and joined.
+                buf = io.StringIO()
+                has_text = _extract_pages(backend, pdf, 0, n_pages, buf)
+                full_text = buf.getvalue()
+        finally:
+            _close_pdf(backend, pdf)
+        if not has_text:
             logger.warning("PDF text extraction resulted in empty or whitespace-only content.")
         return full_text
     except Exception as e:
@@ -27,19 +399,129 @@ def _extract_text_from_pdf(file_stream: io.BytesIO) -> str:
         raise CVParserError(f"Error processing PDF file: {e}")
 
 
+# --- DOCX Extraction ---
+# WordprocessingML elements that contribute to the plain text of a document body.
+_DOCX_BODY = "word/document.xml"
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_PARAGRAPH = _W_NS + "p"
+_W_TEXT = _W_NS + "t"
+_W_TAB = _W_NS + "tab"
+_W_BREAK = _W_NS + "br"
+_W_CARRIAGE_RETURN = _W_NS + "cr"
+
+
 def _extract_text_from_docx(file_stream: io.BytesIO) -> str:
-    """Extracts text from a DOCX file stream."""
+    """
+    Extracts text from a DOCX file stream.
+
+    Streams word/document.xml straight out of the zip archive and writes <w:t> text nodes to a buffer,
+    one line per <w:p> paragraph, instead of building python-docx's Paragraph/Run/Style objects.
+    Elements are cleared as soon as they are read, so memory stays flat for large documents.
+    """
+    from lxml import etree # Streaming XML parser (libxml2)
+    # Reading the zip central directory is cheap; reject non-DOCX input there, before any XML parsing.
+    try:
+        docx_zip = zipfile.ZipFile(file_stream)
+    except zipfile.BadZipFile as e:
+        logger.warning(f"DOCX stream is not a zip archive: {e}")
+        raise CVParserError("Error processing DOCX file: not a valid DOCX (zip) archive.")
     try:
-        document = docx.Document(file_stream)
-        text_parts = [paragraph.text for paragraph in document.paragraphs]
-        full_text = "\n".join(text_parts)
-        if not full_text.strip():
+        if _DOCX_BODY not in docx_zip.NameToInfo:
+            logger.warning(f"DOCX archive has no {_DOCX_BODY}")
+            raise CVParserError(f"Error processing DOCX file: not a valid DOCX (no {_DOCX_BODY}).")
+        buf = io.StringIO()
+        has_text = False # Set by the first text run that isn't blank
+        first_paragraph = True
+        with docx_zip.open(_DOCX_BODY) as document_xml:
+            for event, element in etree.iterparse(
+                document_xml, events=("start", "end"),
+                tag=(_W_PARAGRAPH, _W_TEXT, _W_TAB, _W_BREAK, _W_CARRIAGE_RETURN)
+            ):
+                tag = element.tag
+                if event == "start":
+                    # Paragraphs are newline-separated; the separator goes in as the next one opens.
+                    # Other elements are handled on "end", once their text has been parsed.
+                    if tag == _W_PARAGRAPH:
+                        if buf.tell() >= _MAX_CV_CHARS:
+                            logger.warning(f"DOCX text exceeds {_MAX_CV_CHARS} characters; ignoring the rest of the document.")
+                            break
+                        if not first_paragraph:
+                            buf.write("\n")
+                        first_paragraph = False
+                    continue
+                if tag == _W_TEXT:
+                    text = element.text
+                    if text:
+                        buf.write(text)
+                        if not has_text and not text.isspace():
+                            has_text = True
+                elif tag == _W_TAB:
+                    buf.write("\t")
+                elif tag != _W_PARAGRAPH: # <w:br/> and <w:cr/> are line breaks within a paragraph
+                    buf.write("\n")
+                element.clear()
+        full_text = buf.getvalue()
+        if not has_text:
             logger.warning("DOCX text extraction resulted in empty or whitespace-only content.")
         return full_text
+    except CVParserError:
+        raise
     except Exception as e:
         logger.error(f"Failed to read or parse DOCX stream: {e}", exc_info=True)
-        # python-docx can raise various errors, e.g., PackageNotFoundError for corrupted files
+        # e.g. a corrupted member (zlib/CRC errors) or malformed XML
         raise CVParserError(f"Error processing DOCX file: {e}")
+    finally:
+        docx_zip.close()
+
+
+# --- Text Normalization ---
+# Maps ASCII control characters other than tab, newline and carriage return to a space.
+_CTRL_TRANS = str.maketrans({c: ' ' for c in range(32) if c not in (9, 10, 13)})
+
+
+def _normalize_line_endings(text: str) -> str:
+    """Converts CRLF and lone CR line endings (PDFium returns CRLF) to "\n", so every backend gives the same text."""
+    if '\r' not in text:
+        return text
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+# --- Extractor Dispatch ---
+_EXTRACTORS = {
+    '.pdf': _extract_text_from_pdf,
+    '.docx': _extract_text_from_docx,
+}
+
+
+def _parse(file_stream, extractor, file_extension: str, file_name: str) -> str:
+    """
+    Common path for file and stream inputs: returns cached text for a known CV,
+    otherwise runs the extractor on the seekable stream and caches the stripped result.
+    """
+    # Fingerprinting also leaves the stream at the beginning, ready for parsing
+    cache_key = _content_key(file_stream, file_extension)
+    cached_text = _cache_get(cache_key)
+    if cached_text is not None:
+        logger.info(f"Returning cached text for CV: {file_name}. Text length: {len(cached_text)}")
+        return cached_text
+
+    # Control characters (form feeds, NULs, stray escape codes from PDF text layers) become spaces in one C-level
+    # translate pass. A single strip then only walks the leading/trailing whitespace, and returns the same string
+    # when there is none. Whitespace-only content strips down to "".
+    text_content = extractor(file_stream)
+    if len(text_content) > _MAX_CV_CHARS:
+        logger.warning(f"Text extracted from '{file_name}' has {len(text_content)} characters; keeping the first {_MAX_CV_CHARS}.")
+        text_content = text_content[:_MAX_CV_CHARS]
+    text_content = _normalize_line_endings(text_content).translate(_CTRL_TRANS).strip()
+
+    if not text_content:
+        logger.warning(f"Parsing of '{file_name}' resulted in empty text content. The file might be image-based or corrupted.")
+        # Not raising an error here, as an empty text is a valid parsing outcome for some files (e.g. scanned PDF)
+        # The LLM module will have to handle empty text if it receives it.
+    else:
+        _cache_put(cache_key, text_content) # Empty results aren't cached: a retry may use another backend or settings
+    logger.info(f"Successfully parsed CV: {file_name}. Extracted text length: {len(text_content)}")
+    return text_content
 
 
 def parse_cv(file_path_or_stream, file_name: str) -> str:
@@ -62,68 +544,50 @@ def parse_cv(file_path_or_stream, file_name: str) -> str:
     """
     logger.info(f"Attempting to parse CV: {file_name}")
 
-    _, file_extension = os.path.splitext(file_name.lower())
-
-    text_content = ""
+    # Lowercase only the extension, not the whole (possibly long) uploaded file name
+    dot_index = file_name.rfind('.')
+    file_extension = file_name[dot_index:].lower() if dot_index >= 0 else ''
+    extractor = _EXTRACTORS.get(file_extension)
+    if extractor is None:
+        logger.warning(f"Unsupported file type: {file_extension} for file {file_name}")
+        raise CVParserError(f"Unsupported file type: {file_extension}. Please upload a PDF or DOCX file.")
 
     try:
         if isinstance(file_path_or_stream, str): # It's a file path
             logger.debug(f"Parsing CV from file path: {file_path_or_stream}")
-            if not os.path.exists(file_path_or_stream):
+            # Read the whole file in one go: fingerprinting and parsing then both work on memory,
+            # instead of re-reading the file through many small reads and seeks.
+            # open() itself reports a missing file, so there's no separate (racy) existence check.
+            try:
+                with open(file_path_or_stream, 'rb') as f_stream:
+                    file_bytes = f_stream.read()
+            except FileNotFoundError as e:
                 logger.error(f"File not found at path: {file_path_or_stream}")
-                raise FileNotFoundError(f"CV file not found: {file_path_or_stream}")
-
-            with open(file_path_or_stream, 'rb') as f_stream:
-                if file_extension == '.pdf':
-                    text_content = _extract_text_from_pdf(f_stream)
-                elif file_extension == '.docx':
-                    text_content = _extract_text_from_docx(f_stream)
-                else:
-                    logger.warning(f"Unsupported file type: {file_extension} for file {file_name}")
-                    raise CVParserError(f"Unsupported file type: {file_extension}. Please upload a PDF or DOCX file.")
+                raise FileNotFoundError(f"CV file not found: {file_path_or_stream}") from e
+            return _parse(io.BytesIO(file_bytes), extractor, file_extension, file_name)
 
         elif hasattr(file_path_or_stream, 'read'): # It's a file-like object (stream)
             logger.debug(f"Parsing CV from stream: {file_name}")
-            # Ensure it's a BytesIO stream if it's not already
-            if not isinstance(file_path_or_stream, io.BytesIO):
-                # If it's another type of stream (e.g., SpooledTemporaryFile from Telegram),
-                # read its content into BytesIO.
-                # This might not be strictly necessary if PyPDF2/python-docx can handle other stream types,
-                # but BytesIO is generally safe.
-                current_pos = file_path_or_stream.tell() # Remember current position
-                file_path_or_stream.seek(0)
-                file_bytes = file_path_or_stream.read()
-                file_path_or_stream.seek(current_pos) # Reset position for other potential readers
-
-                stream_to_parse = io.BytesIO(file_bytes)
-            else:
+            if _is_seekable(file_path_or_stream):
+                # Parse the caller's stream in place (BytesIO, open file, Telegram's SpooledTemporaryFile, ...)
+                # instead of copying it into a fresh BytesIO; its position is restored afterwards.
                 stream_to_parse = file_path_or_stream
-
-            # Ensure stream is at the beginning before parsing
-            stream_to_parse.seek(0)
-
-            if file_extension == '.pdf':
-                text_content = _extract_text_from_pdf(stream_to_parse)
-            elif file_extension == '.docx':
-                text_content = _extract_text_from_docx(stream_to_parse)
+                original_pos = file_path_or_stream.tell()
             else:
-                logger.warning(f"Unsupported file type: {file_extension} for file {file_name}")
-                raise CVParserError(f"Unsupported file type: {file_extension}. Please upload a PDF or DOCX file.")
+                # Unseekable streams (pipes, sockets) are buffered once so they can be fingerprinted and parsed.
+                stream_to_parse = io.BytesIO(file_path_or_stream.read())
+                original_pos = None
 
-            stream_to_parse.seek(0) # Reset stream position again after reading, good practice
+            try:
+                return _parse(stream_to_parse, extractor, file_extension, file_name)
+            finally:
+                if original_pos is not None:
+                    stream_to_parse.seek(original_pos) # Leave the caller's stream where we found it
 
         else:
             logger.error(f"Invalid input type for file_path_or_stream: {type(file_path_or_stream)}")
             raise CVParserError("Invalid input: Must be a file path string or a file-like stream object.")
 
-        if not text_content.strip():
-            logger.warning(f"Parsing of '{file_name}' resulted in empty text content. The file might be image-based or corrupted.")
-            # Not raising an error here, as an empty text is a valid parsing outcome for some files (e.g. scanned PDF)
-            # The LLM module will have to handle empty text if it receives it.
-
-        logger.info(f"Successfully parsed CV: {file_name}. Extracted text length: {len(text_content)}")
-        return text_content.strip() # Return stripped text
-
     except FileNotFoundError as fnf_err: # Specifically re-raise FileNotFoundError
         raise fnf_err
     except CVParserError: # Re-raise CVParserError directly
@@ -169,6 +633,7 @@ if __name__ == '__main__':
     dummy_docx_path = os.path.join(test_cv_dir, "dummy_cv.docx")
     if not os.path.exists(dummy_docx_path):
         try:
+            import docx # python-docx is only needed to generate the dummy file
             doc = docx.Document()
             doc.add_paragraph("This is a dummy DOCX CV.")
             doc.add_paragraph("Jane Doe - jane.doe@example.com")
@@ -253,6 +718,7 @@ if __name__ == '__main__':
         print(f"\n--- Testing Empty PDF from path: {empty_pdf_path} ---")
         try:
             empty_pdf_text = parse_cv(empty_pdf_path, "empty.pdf")
+            # The checked-in empty.pdf has a broken xref table: PDFium refuses it, the PyPDF2 fallback reads no pages
             print(f"Extracted Empty PDF text (path should be empty or warning issued):\n'{empty_pdf_text}'\n")
         except Exception as e:
             print(f"Error parsing Empty PDF from path: {e}")
@@ -1,5 +1,8 @@
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 
 # --- Custom Exception Classes ---
 class JobApplicationAgentError(Exception):
@@ -32,6 +35,9 @@ class DataStorageError(JobApplicationAgentError):
 
 # --- Logging Setup ---
 _root_logger_configured = False
+_warned_unconfigured = False # get_logger's "not configured yet" warning is emitted at most once
+_get_logger = logging.getLogger
+_log_listener = None # Background thread that writes queued log records, started by setup_logging
 
 def setup_logging(log_file_path: str, level: str = "INFO"):
     """
@@ -56,9 +62,7 @@ def setup_logging(log_file_path: str, level: str = "INFO"):
     log_dir = os.path.dirname(log_file_path)
     if log_dir: # Check if log_dir is not an empty string (e.g. if log_file_path is just "app.log")
         try:
-            if not os.path.exists(log_dir):
-                os.makedirs(log_dir)
-                logging.info(f"Log directory created: {log_dir}")
+            os.makedirs(log_dir, exist_ok=True) # No separate exists() check; safe when several workers start at once
         except OSError as e:
             # Fallback to basic console logging for this specific error
             logging.basicConfig(level=logging.ERROR, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -68,15 +72,29 @@ def setup_logging(log_file_path: str, level: str = "INFO"):
             # but at least this specific error is noted.
 
     # Configure root logger
-    # Using basicConfig is fine for simpler setups. For more control (e.g. multiple handlers with different
-    # levels or formatters), you would get the root logger and add handlers to it manually.
+    # Log calls only format the message and put the record on a queue; a background QueueListener thread
+    # does the actual file/console writes, so callers (e.g. per-page PDF warnings) never block on I/O.
+    log_formatter = logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s"
+    )
+    file_handler = logging.FileHandler(log_file_path, mode='a') # 'a' for append
+    file_handler.setFormatter(log_formatter)
+    stream_handler = logging.StreamHandler() # Log to console (stderr by default)
+    stream_handler.setFormatter(log_formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # The queue handler only renders the message (plus any traceback); the listener's handlers add the rest.
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+
+    global _log_listener
+    _log_listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(_log_listener.stop) # Drains the queue so records logged just before exit are written
+
     logging.basicConfig(
         level=log_level_int,
-        format="%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s",
-        handlers=[
-            logging.FileHandler(log_file_path, mode='a'), # 'a' for append
-            logging.StreamHandler()  # Log to console (stderr by default)
-        ],
+        handlers=[queue_handler],
         # force=True # Use with caution: force=True can be useful if re-configuring, but ensure it's intended.
                    # Not using it here to avoid masking multiple calls if setup_logging is called incorrectly.
     )
@@ -100,17 +118,18 @@ def get_logger(name: str) -> logging.Logger:
     Returns:
         logging.Logger: Logger instance.
     """
-    if not _root_logger_configured:
+    global _warned_unconfigured
+    if not _warned_unconfigured and not _root_logger_configured:
         # This is a safeguard. Ideally, setup_logging is called once in main.py.
         # If not, loggers obtained before setup_logging will use default settings.
-        # We could raise an error here, or log a warning.
-        # For now, we'll log a warning to the default logger.
+        # Every module calls get_logger at import time, so warn once per process rather than once per module.
         # This warning might not go to the file if setup_logging is called later.
+        _warned_unconfigured = True
         logging.warning(
             f"get_logger('{name}') called before global logging setup. "
             "Logging may not be fully configured yet. Call setup_logging() early in your application."
         )
-    return logging.getLogger(name)
+    return _get_logger(name)
 
 if __name__ == '__main__':
     # This block is for testing the error_handler module directly.
@@ -171,6 +190,7 @@ if __name__ == '__main__':
 
     module_logger.info("Simulating a call to get_logger before setup (for testing the warning).")
     _root_logger_configured = False # Temporarily reset for test
+    _warned_unconfigured = False
     logger_before_setup = get_logger("test_before_setup")
     logger_before_setup.warning("This warning is from a logger obtained before (simulated) setup_logging.")
     # Re-configure for any subsequent tests if needed, or end here.
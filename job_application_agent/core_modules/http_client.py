@@ -0,0 +1,74 @@
+from typing import Optional
+
+import httpx
+
+from job_application_agent import config
+from job_application_agent.core_modules.error_handler import get_logger
+
+try:
+    import h2 # Optional; enables HTTP/2 for the shared client (pip install "httpx[http2]")
+except ImportError:
+    h2 = None
+
+logger = get_logger(__name__)
+
+# --- Defaults (overridable in config.py) ---
+_DEFAULT_TIMEOUT_SECONDS = 30
+_DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 32
+_DEFAULT_MAX_CONNECTIONS = 128
+
+# One client, and so one connection pool, for all of the agent's own outbound HTTP (the Bot API has its own
+# pool inside python-telegram-bot). Reusing it keeps connections alive between requests, so repeat requests to
+# a host skip the TCP and TLS handshakes.
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the shared httpx.AsyncClient, creating it on first use (or after close_http_client()).
+    Settings come from config.py: HTTP_TIMEOUT_SECONDS, HTTP_MAX_KEEPALIVE_CONNECTIONS, HTTP_MAX_CONNECTIONS.
+    Uses HTTP/2 if the h2 package is installed.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=h2 is not None,
+            timeout=getattr(config, 'HTTP_TIMEOUT_SECONDS', _DEFAULT_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_keepalive_connections=getattr(config, 'HTTP_MAX_KEEPALIVE_CONNECTIONS', _DEFAULT_MAX_KEEPALIVE_CONNECTIONS),
+                max_connections=getattr(config, 'HTTP_MAX_CONNECTIONS', _DEFAULT_MAX_CONNECTIONS)
+            ),
+            follow_redirects=True
+        )
+        logger.debug("Created shared HTTP client (HTTP/2: %s).", h2 is not None)
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Closes the shared client and its connections, if it was created. Safe to call more than once."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        logger.debug("Shared HTTP client closed.")
+
+
+# --- Example Usage (for testing) ---
+if __name__ == '__main__':
+    import asyncio
+
+    async def main_test():
+        print("--- http_client.py standalone test ---")
+        client = get_http_client()
+        assert get_http_client() is client # Same client, same pool
+        try:
+            response = await client.get("https://realpython.github.io/fake-jobs/")
+            print(f"GET fake-jobs: {response.status_code} over {response.http_version}")
+        except httpx.HTTPError as e:
+            print(f"Request failed (offline?): {e}")
+        await close_http_client()
+        assert get_http_client() is not client # A fresh client after closing
+        await close_http_client()
+        print("--- http_client.py standalone test complete ---")
+
+    asyncio.run(main_test())
@@ -1,10 +1,20 @@
+import atexit
 import json
+import mmap
 import os
+import sqlite3
+import sys
 import datetime
-from typing import Dict, Any, List, Optional, Union
+import functools
+import gzip
+import queue
+import threading
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
 
 from job_application_agent import config
 from job_application_agent.core_modules.error_handler import DataStorageError, get_logger
+from job_application_agent.utils import json_dumps, json_loads
 
 logger = get_logger(__name__)
 
@@ -27,8 +37,11 @@ _initialized = False
 
 def initialize_storage():
     """
-    Creates necessary data storage directories if they don't exist.
-    Should be called once at application startup.
+    Creates necessary data storage directories if they don't exist and opens the applications database,
+    so a bad data location is reported at startup. Calling it again is a no-op.
+    Nothing happens at import: the app calls this once at startup, and the functions below still work without
+    it (the database directory is created when the database is first opened, and the history writer thread
+    starts with the first write).
     """
     global _initialized
     if _initialized:
@@ -36,234 +49,733 @@ def initialize_storage():
 
     dirs_to_create = [USER_DATA_DIR, JOB_HISTORY_DIR]
     for dir_path in dirs_to_create:
+        # mkdir both creates the directory and tells us whether it already existed, without a separate stat
         try:
-            if not os.path.exists(dir_path):
-                os.makedirs(dir_path)
-                logger.info(f"Successfully created directory: {dir_path}")
-            else:
-                logger.debug(f"Directory already exists: {dir_path}")
+            try:
+                os.mkdir(dir_path)
+            except FileNotFoundError: # The base data directory doesn't exist yet either
+                os.makedirs(dir_path, exist_ok=True)
+            logger.info("Successfully created directory: %s", dir_path)
+        except FileExistsError:
+            logger.debug("Directory already exists: %s", dir_path)
         except OSError as e:
-            logger.error(f"Failed to create directory {dir_path}: {e}", exc_info=True)
+            logger.error("Failed to create directory %s: %s", dir_path, e, exc_info=True)
             # This is a critical error for data storage.
             raise DataStorageError(f"Failed to create necessary storage directory {dir_path}: {e}")
+    _get_connection() # Creates the database and schema now, so a bad location fails here rather than on first use
     _initialized = True
     logger.info("Job manager storage initialized.")
 
+def _now_iso() -> str:
+    """
+    Current time as a UTC ISO 8601 string with second precision, e.g. "2024-05-01T09:30:00+00:00".
+    Each write computes this once and shares it across all the records it produces.
+    """
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+
+# --- Read Cache ---
+# Parsed profiles are cached per file path together with the file's
+# (st_mtime_ns, st_size) at read time. A read whose stat still matches is served from memory; any other
+# change to the file (another process, a manual edit) changes the stat and forces a fresh read.
+# Cached objects are returned as-is, not copied: callers must treat them as read-only.
+_JSON_CACHE: Dict[str, Tuple[int, int, Any]] = {}
+_cache_lock = threading.RLock()
+
+
+def _file_signature(file_path: str) -> Optional[Tuple[int, int]]:
+    """Returns (st_mtime_ns, st_size) for file_path, or None if it doesn't exist."""
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _cache_lookup(file_path: str, signature: Optional[Tuple[int, int]]) -> Any:
+    """Returns the cached object for file_path if it was read at the given signature, else None."""
+    entry = _JSON_CACHE.get(file_path)
+    if entry is not None and entry[:2] == signature:
+        return entry[2]
+    return None
+
+
+def _cache_store(file_path: str, data: Any) -> None:
+    """Caches data as the current content of file_path (call right after writing or reading it)."""
+    signature = _file_signature(file_path)
+    if signature is None:
+        _JSON_CACHE.pop(file_path, None)
+    else:
+        _JSON_CACHE[file_path] = (signature[0], signature[1], data)
+
+
 # --- Private Helper Functions for JSON I/O ---
-def _write_json(file_path: str, data: Union[Dict[Any, Any], List[Any]]) -> None:
-    """Writes dictionary or list data to a JSON file."""
-    logger.debug(f"Writing JSON data to: {file_path}")
+def _write_json(file_path: str, data: Union[Dict[Any, Any], List[Any]], *, durable: bool = False) -> None:
+    """
+    Writes dictionary or list data to a JSON file.
+    The file is written to a temporary path and renamed over the target, so readers never see a partial file.
+    With durable=True the data is fsync'ed before the rename.
+    """
+    logger.debug("Writing JSON data to: %s", file_path)
     try:
         # Ensure directory for the file exists
         dir_name = os.path.dirname(file_path)
-        if not os.path.exists(dir_name):
-            try:
-                os.makedirs(dir_name) # Create if writing to a new user's dir for example
-            except OSError as e:
-                raise DataStorageError(f"Failed to create directory {dir_name} for file {file_path}: {e}")
-
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-        logger.debug(f"Successfully wrote JSON data to: {file_path}")
+        try:
+            os.makedirs(dir_name, exist_ok=True) # Create if writing to a new user's dir for example
+        except OSError as e:
+            raise DataStorageError(f"Failed to create directory {dir_name} for file {file_path}: {e}")
+
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, 'wb', buffering=1 << 20) as f:
+            f.write(json_dumps(data, pretty=True)) # orjson when available; 2-space indent keeps files readable
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+        with _cache_lock:
+            _cache_store(file_path, data)
+        logger.debug("Successfully wrote JSON data to: %s", file_path)
     except IOError as e:
-        logger.error(f"IOError writing JSON to {file_path}: {e}", exc_info=True)
+        logger.error("IOError writing JSON to %s: %s", file_path, e, exc_info=True)
         raise DataStorageError(f"Failed to write to file {file_path}: {e}")
     except TypeError as e: # e.g. if data is not serializable
-        logger.error(f"TypeError, data not JSON serializable for {file_path}: {e}", exc_info=True)
+        logger.error("TypeError, data not JSON serializable for %s: %s", file_path, e, exc_info=True)
         raise DataStorageError(f"Data is not JSON serializable for {file_path}: {e}")
 
+# Files up to this size are read with a plain read(); setting up a mapping costs more than copying them.
+_MMAP_MIN_BYTES = 32 * 1024
+
+
 def _read_json(file_path: str) -> Optional[Union[Dict[Any, Any], List[Any]]]:
     """Reads dictionary or list data from a JSON file."""
-    logger.debug(f"Reading JSON data from: {file_path}")
-    if not os.path.exists(file_path):
-        logger.warning(f"JSON file not found: {file_path}")
+    signature = _file_signature(file_path)
+    if signature is None:
+        logger.warning("JSON file not found: %s", file_path)
         return None # Or raise DataStorageError("File not found") depending on desired strictness
 
+    with _cache_lock:
+        data = _cache_lookup(file_path, signature)
+    if data is not None:
+        logger.debug("Returning cached JSON data for: %s", file_path)
+        return data
+
+    logger.debug("Reading JSON data from: %s", file_path)
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        logger.debug(f"Successfully read JSON data from: {file_path}")
+        with open(file_path, 'rb') as f:
+            if signature[1] > _MMAP_MIN_BYTES:
+                # Parse straight from the page cache instead of copying the file into a bytes object first
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                    data = json_loads(view)
+            else:
+                data = json_loads(f.read())
+        with _cache_lock:
+            # Keyed by the stat taken before reading: if the file changed in between, the next read won't match
+            _JSON_CACHE[file_path] = (signature[0], signature[1], data)
+        logger.debug("Successfully read JSON data from: %s", file_path)
         return data
     except IOError as e:
-        logger.error(f"IOError reading JSON from {file_path}: {e}", exc_info=True)
+        logger.error("IOError reading JSON from %s: %s", file_path, e, exc_info=True)
         raise DataStorageError(f"Failed to read file {file_path}: {e}")
     except json.JSONDecodeError as e:
-        logger.error(f"JSONDecodeError for file {file_path}: {e}", exc_info=True)
+        logger.error("JSONDecodeError for file %s: %s", file_path, e, exc_info=True)
         raise DataStorageError(f"Invalid JSON format in file {file_path}: {e}")
 
 # --- User Profile Management ---
+@functools.lru_cache(maxsize=1024)
+def _profile_path(user_id: str) -> str:
+    return os.path.join(USER_DATA_DIR, f"{user_id}_profile.json")
+
+
 def store_user_profile(user_id: str, cv_analysis: Dict[str, Any], preferences: Dict[str, Any]) -> None:
     """
     Saves or updates a user's profile data (CV analysis, preferences).
     """
-    if not _initialized: initialize_storage() # Ensure directories exist
-
     profile_data = {
         "user_id": user_id,
         "cv_analysis": cv_analysis,
         "preferences": preferences,
-        "last_updated": datetime.datetime.now().isoformat()
+        "last_updated": _now_iso()
     }
-    file_path = os.path.join(USER_DATA_DIR, f"{user_id}_profile.json")
+    file_path = _profile_path(user_id)
 
     _write_json(file_path, profile_data)
-    logger.info(f"User profile for {user_id} stored/updated successfully at {file_path}.")
+    logger.info("User profile for %s stored/updated successfully at %s.", user_id, file_path)
 
 def load_user_profile(user_id: str) -> Optional[Dict[str, Any]]:
     """
     Loads a user's profile data. Returns None if profile not found.
+    The returned dict is shared with the read cache and must not be modified.
     """
-    if not _initialized: initialize_storage()
-
-    file_path = os.path.join(USER_DATA_DIR, f"{user_id}_profile.json")
+    file_path = _profile_path(user_id)
     profile_data = _read_json(file_path)
     if profile_data:
-        logger.info(f"User profile for {user_id} loaded successfully from {file_path}.")
+        logger.info("User profile for %s loaded successfully from %s.", user_id, file_path)
         return profile_data
     else:
-        logger.info(f"No profile found for user {user_id} at {file_path}.")
+        logger.info("No profile found for user %s at %s.", user_id, file_path)
         return None
 
 # --- Job Application Tracking ---
-def log_application(user_id: str, job_id: str, job_details: Dict[str, Any], status: str = "applied") -> None:
+# All users' applications live in one SQLite database (JOB_HISTORY_DIR/jobs.db), one row per (user_id, job_id).
+# "details" is stored as JSON text; the other fields are plain columns, so a status change updates one row
+# instead of rewriting a user's whole history. Histories are read back most recently applied first
+# (applied_at, then rowid for entries logged in the same second); see get_user_job_history.
+# Each thread gets its own connection (sqlite3 connections can't be shared across threads), opened in WAL
+# mode so readers never block the background writer and vice versa.
+_DB_FILENAME = "jobs.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS applications (
+    user_id TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    details TEXT NOT NULL,
+    applied_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, job_id)
+)
+"""
+# The primary key index already serves lookups by user_id alone, so there is no separate user index.
+
+# Re-logging a known job replaces its status and details but keeps the original applied_at (and its rowid,
+# so it keeps its place in the history).
+_UPSERT_SQL = (
+    "INSERT INTO applications (user_id, job_id, status, details, applied_at, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (user_id, job_id) DO UPDATE SET "
+    "status = excluded.status, details = excluded.details, updated_at = excluded.updated_at"
+)
+_UPDATE_STATUS_SQL = "UPDATE applications SET status = ?, updated_at = ? WHERE user_id = ? AND job_id = ?"
+_MIGRATE_SQL = (
+    "INSERT OR IGNORE INTO applications (user_id, job_id, status, details, applied_at, updated_at) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+_db_local = threading.local()
+
+
+def _db_path() -> str:
+    return os.path.join(JOB_HISTORY_DIR, _DB_FILENAME)
+
+
+def _get_connection() -> sqlite3.Connection:
     """
-    Logs a new job application for a user or updates an existing one if job_id matches.
-    job_id should be a unique identifier for the job posting (e.g., URL or a hash of it).
+    Returns this thread's connection to the applications database, opening it on first use
+    (or after reinitialize() moved the database).
     """
-    if not _initialized: initialize_storage()
+    db_path = _db_path()
+    conn = getattr(_db_local, 'conn', None)
+    if conn is not None:
+        if _db_local.path == db_path:
+            return conn
+        conn.close()
+        _db_local.conn = None
+
+    logger.debug("Opening job applications database: %s", db_path)
+    try:
+        os.makedirs(os.path.dirname(db_path), exist_ok=True) # In case initialize_storage() wasn't called
+    except OSError as e:
+        logger.error("Failed to create directory for %s: %s", db_path, e, exc_info=True)
+        raise DataStorageError(f"Failed to create necessary storage directory for {db_path}: {e}")
+    try:
+        # Autocommit mode: the writer manages its own transactions, reads don't need one
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL") # With WAL, only a power loss can drop the last commits
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(_SCHEMA)
+    except sqlite3.Error as e:
+        logger.error("Failed to open job applications database %s: %s", db_path, e, exc_info=True)
+        raise DataStorageError(f"Failed to open database {db_path}: {e}")
+    _db_local.conn = conn
+    _db_local.path = db_path
+    return conn
+
+
+def _encode_details(user_id: str, job_details: Dict[str, Any]) -> str:
+    """Serializes job details for the details column, raising DataStorageError for data that isn't JSON serializable."""
+    try:
+        return json_dumps(job_details).decode('utf-8')
+    except TypeError as e: # e.g. if job_details is not serializable
+        logger.error("TypeError, job details not JSON serializable for user %s: %s", user_id, e, exc_info=True)
+        raise DataStorageError(f"Job details are not JSON serializable for user {user_id}: {e}")
 
-    history_file_path = os.path.join(JOB_HISTORY_DIR, f"{user_id}_job_applications.json")
 
-    # Read existing history. _read_json can return Dict or List.
-    # For log_application, we expect a List of applications.
-    raw_job_history = _read_json(history_file_path)
-    job_history: List[Dict[str, Any]] = []
+# Short categorical detail fields repeat across many applications ("OpenAI", "Remote", ...). Interning them
+# when rows are read means all entries share one str object per distinct value instead of one per row.
+# This only affects memory; the stored JSON is unchanged.
+_INTERNED_DETAIL_FIELDS = ("company", "title", "location", "source")
 
-    if isinstance(raw_job_history, list):
-        job_history = raw_job_history
-    elif isinstance(raw_job_history, dict) and "applications" in raw_job_history and isinstance(raw_job_history["applications"], list):
-        # Compatibility for old format {"applications": []}
-        logger.info(f"Reading job history for user {user_id} in old dictionary format. Will convert to list.")
-        job_history = raw_job_history["applications"]
-    elif raw_job_history is None:
-        logger.info(f"No existing job history file found for user {user_id}. Starting new list.")
-        job_history = []
-    else:
-        # This case should ideally not happen if data is written correctly.
-        # It indicates a malformed file that is neither a list nor the expected dict.
-        logger.warning(f"Job history file for user {user_id} is in an unexpected format. Type: {type(raw_job_history)}. Initializing as new list.")
-        job_history = []
 
-    application_entry = {
+def _intern_details(details: Dict[str, Any]) -> Dict[str, Any]:
+    for key in _INTERNED_DETAIL_FIELDS:
+        value = details.get(key)
+        if type(value) is str:
+            details[key] = sys.intern(value)
+    return details
+
+
+def _row_to_entry(row: Tuple[str, str, str, str, str]) -> Dict[str, Any]:
+    """Builds the application entry returned by get_user_job_history from a (job_id, status, details, applied_at, updated_at) row."""
+    job_id, status, details, applied_at, updated_at = row
+    details = json_loads(details) # e.g., title, company, url
+    return {
         "job_id": job_id,
-        "details": job_details, # e.g., title, company, url
-        "status": status,
-        "applied_at": datetime.datetime.now().isoformat(),
-        "last_updated_status_at": datetime.datetime.now().isoformat()
+        "details": _intern_details(details) if isinstance(details, dict) else details,
+        "status": sys.intern(status),
+        "applied_at": applied_at,
+        "last_updated_status_at": updated_at
     }
 
-    # Check if job_id already exists to update it, otherwise append
-    found_existing = False
-    for i, entry in enumerate(job_history):
-        if entry.get("job_id") == job_id:
-            # Preserve original applied_at, update other fields
-            original_applied_at = entry.get("applied_at", application_entry["applied_at"])
-            job_history[i] = application_entry
-            job_history[i]["applied_at"] = original_applied_at # Keep original application date
-            job_history[i]["last_updated_status_at"] = datetime.datetime.now().isoformat()
-            found_existing = True
-            logger.info(f"Updated existing application for job_id {job_id} for user {user_id}.")
-            break
 
-    if not found_existing:
-        job_history.append(application_entry)
-        logger.info(f"Logged new application for job_id {job_id} for user {user_id}.")
+# --- Migration of File-Based Histories ---
+# Before the database, each user's history was a file in JOB_HISTORY_DIR: a whole-file JSON document
+# (<user>_job_applications.json) or a JSON Lines event log (<user>_job_applications.jsonl, plus a gzip
+# snapshot segment <log>.gz). The first time a user is read or written in a process, any such files are
+# imported and renamed to *.migrated, so this costs one stat per user per process afterwards.
+_migrated_users: set = set()
+_migration_lock = threading.Lock()
+
 
-    # Save the job_history list directly
-    _write_json(history_file_path, job_history)
+def _legacy_paths(user_id: str) -> Tuple[str, str, str]:
+    """Returns the (whole-file JSON, event log gzip segment, event log) paths of a user's file-based history."""
+    json_path = os.path.join(JOB_HISTORY_DIR, f"{user_id}_job_applications.json")
+    log_path = os.path.join(JOB_HISTORY_DIR, f"{user_id}_job_applications.jsonl")
+    return json_path, f"{log_path}.gz", log_path
+
+
+def _apply_event(history: Dict[str, Dict[str, Any]], event: Dict[str, Any]) -> None:
+    """Folds one event of a file-based event log into the job_id -> application entry mapping."""
+    op = event.get("op")
+    if op == "put":
+        entry = event["entry"]
+        history[entry["job_id"]] = entry
+        return
+
+    job_id = event["job_id"]
+    existing = history.get(job_id)
+    if op == "log":
+        history[job_id] = {
+            "job_id": job_id,
+            "details": event.get("details", {}),
+            "status": event["status"],
+            "applied_at": existing.get("applied_at", event["ts"]) if existing else event["ts"],
+            "last_updated_status_at": event["ts"]
+        }
+    elif op == "status" and existing is not None:
+        existing["status"] = event["status"]
+        existing["last_updated_status_at"] = event["ts"]
+
+
+def _replay_lines(f, file_path: str, history: Dict[str, Dict[str, Any]]) -> None:
+    """Applies every event line of an open (binary) event log to history, skipping malformed lines."""
+    for line_num, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            _apply_event(history, json_loads(line))
+        except (ValueError, KeyError, TypeError) as e: # ValueError covers JSON and UTF-8 decode errors
+            # e.g. a line cut short by a crash mid-append; the rest of the log is still usable
+            logger.warning("Skipping malformed line %s in %s: %s", line_num, file_path, e)
+
+
+def _read_legacy_history(user_id: str, json_path: str, gzip_path: str, log_path: str) -> Dict[str, Dict[str, Any]]:
+    """Reads whichever file-based history files exist for a user into one job_id -> entry mapping."""
+    history: Dict[str, Dict[str, Any]] = {}
+    if os.path.exists(json_path):
+        raw_job_history = _read_json(json_path)
+        if isinstance(raw_job_history, dict) and isinstance(raw_job_history.get("applications"), (list, dict)):
+            # Compatibility for old formats {"applications": [...]} and {"applications": {job_id: entry}}
+            raw_job_history = raw_job_history["applications"]
+            if isinstance(raw_job_history, dict):
+                raw_job_history = list(raw_job_history.values())
+        if isinstance(raw_job_history, list):
+            for entry in raw_job_history:
+                if isinstance(entry, dict) and "job_id" in entry:
+                    history[entry["job_id"]] = entry
+        else:
+            logger.warning("Legacy job history for user %s is in an unexpected format. Type: %s. Not migrating it.", user_id, type(raw_job_history))
+    try:
+        if os.path.exists(gzip_path):
+            with gzip.open(gzip_path, 'rb') as f:
+                _replay_lines(f, gzip_path, history)
+        if os.path.exists(log_path):
+            with open(log_path, 'rb') as f:
+                _replay_lines(f, log_path, history)
+    except (IOError, EOFError) as e: # EOFError: truncated gzip segment
+        logger.error("IOError reading job history from %s: %s", log_path, e, exc_info=True)
+        raise DataStorageError(f"Failed to read file {log_path}: {e}")
+    return history
+
+
+def _legacy_ts_to_utc(value: Any) -> Optional[str]:
+    """
+    Converts a file-based history timestamp to the stored UTC ISO 8601 form (see _now_iso).
+    The files used naive local times (datetime.now().isoformat()); those are taken as this machine's local
+    time. Values that aren't ISO 8601 strings are kept as they are; empty values give None.
+    """
+    if not value:
+        return None
+    try:
+        ts = datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        logger.warning("Keeping unrecognized job history timestamp as is: %r", value)
+        return value
+    # astimezone() on a naive datetime assumes local time
+    return ts.astimezone(datetime.timezone.utc).isoformat(timespec='seconds')
+
+
+def _ensure_migrated(user_id: str, conn: sqlite3.Connection) -> None:
+    """Imports a user's file-based history into the database, once per user per process."""
+    if user_id in _migrated_users:
+        return
+    with _migration_lock:
+        if user_id in _migrated_users:
+            return
+        paths = [path for path in _legacy_paths(user_id) if os.path.exists(path)]
+        if paths:
+            history = _read_legacy_history(user_id, *_legacy_paths(user_id))
+            now = _now_iso()
+            rows = []
+            for job_id, entry in history.items():
+                # Stored timestamps must all be UTC ISO strings for applied_at ordering and `since` filters to work
+                applied_at = _legacy_ts_to_utc(entry.get("applied_at")) or now
+                rows.append((
+                    user_id, job_id, entry.get("status", "applied"), _encode_details(user_id, entry.get("details", {})),
+                    applied_at, _legacy_ts_to_utc(entry.get("last_updated_status_at")) or applied_at
+                ))
+            try:
+                with conn: # One transaction; rows already in the database win over the files
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.executemany(_MIGRATE_SQL, rows)
+            except sqlite3.Error as e:
+                logger.error("Failed to migrate job history for user %s: %s", user_id, e, exc_info=True)
+                raise DataStorageError(f"Failed to migrate job history for user {user_id}: {e}")
+            for path in paths:
+                os.replace(path, f"{path}.migrated") # Keep the originals around, but never read them again
+            logger.info("Migrated %s job applications for user %s into %s.", len(rows), user_id, _db_path())
+        _migrated_users.add(user_id)
+
+
+# --- Background History Writer ---
+# log_application / update_application_status only serialize their rows and queue the statements; a daemon
+# thread collects whatever arrives within _WRITE_BATCH_WINDOW seconds and commits it in one transaction.
+# Reads (and flush_sync) drain the queue first, so callers always see their own writes.
+# Anything that can fail for one user alone (serializing details, importing a file-based history) happens on
+# the caller's thread before queueing, so it can't take other users' writes in the same batch down with it.
+# If a commit fails anyway (locked or read-only database, disk full), the error is kept and raised as
+# DataStorageError by the next flush_sync(), read or queued write.
+_WRITE_BATCH_WINDOW = 0.1
+_WRITE_BATCH_MAX = 512
+_FLUSH_NOW = None # Queue sentinel: ends the current batch window immediately
+_write_queue: "queue.Queue[Optional[Tuple[str, List[Tuple[str, Tuple[Any, ...]]], bool]]]" = queue.Queue()
+_writer_thread: Optional[threading.Thread] = None
+_writer_start_lock = threading.Lock()
+_writer_error: Optional[Exception] = None # First failure not yet reported to a caller
+_writer_error_lock = threading.Lock()
+
+
+def _start_writer() -> None:
+    """Starts the background writer thread (once per process, on the first queued write)."""
+    global _writer_thread
+    with _writer_start_lock:
+        if _writer_thread is not None:
+            return
+        _writer_thread = threading.Thread(target=_writer_loop, name="job-history-writer", daemon=True)
+        _writer_thread.start()
+        atexit.register(_flush_at_exit) # Daemon threads are killed at exit; write out anything still queued
+    logger.debug("Job history writer thread started.")
+
+
+def _flush_at_exit() -> None:
+    try:
+        flush_sync()
+    except DataStorageError:
+        pass # Already logged by the writer; nobody is left to report it to
+
+
+def _raise_writer_error() -> None:
+    """Raises a background write failure that no caller has seen yet (each failure is raised once)."""
+    global _writer_error
+    with _writer_error_lock:
+        error, _writer_error = _writer_error, None
+    if error is not None:
+        raise DataStorageError(f"Failed to write job history: {error}") from error
+
+
+def _writer_loop() -> None:
+    while True:
+        batch = [_write_queue.get()]
+        deadline = time.monotonic() + _WRITE_BATCH_WINDOW
+        while batch[-1] is not _FLUSH_NOW and len(batch) < _WRITE_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_write_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        try:
+            _write_batch([item for item in batch if item is not _FLUSH_NOW])
+        finally:
+            for _ in batch:
+                _write_queue.task_done()
+
+
+def _write_batch(items: List[Tuple[str, List[Tuple[str, Tuple[Any, ...]]], bool]]) -> None:
+    """
+    Executes queued statements in order, in a single transaction.
+    If any item asked for durability, the commit is synced to disk (synchronous=FULL) before returning.
+    """
+    if not items:
+        return
+    n_statements = sum(len(statements) for _, statements, _ in items)
+    durable = any(item_durable for _, _, item_durable in items)
+    global _writer_error
+    try:
+        conn = _get_connection()
+        if durable:
+            conn.execute("PRAGMA synchronous=FULL")
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for _, statements, _ in items:
+                    for sql, params in statements: # sqlite3 keeps these prepared in its per-connection statement cache
+                        conn.execute(sql, params)
+        finally:
+            if durable:
+                conn.execute("PRAGMA synchronous=NORMAL")
+    except Exception as e:
+        logger.error("Background write of %s job history statement(s) failed: %s", n_statements, e, exc_info=True)
+        with _writer_error_lock:
+            if _writer_error is None:
+                _writer_error = e
+
+
+def _queue_history_writes(user_id: str, statements: List[Tuple[str, Tuple[Any, ...]]], durable: bool = False) -> None:
+    """
+    Queues statements for the background writer. durable=True has the writer sync the commit to disk.
+    Raises DataStorageError if the user's file-based history can't be imported, or if an earlier background
+    write failed.
+    """
+    _raise_writer_error()
+    _ensure_migrated(user_id, _get_connection()) # Only the first write per user and process does any work
+    if _writer_thread is None:
+        _start_writer()
+    _write_queue.put((user_id, statements, durable))
+
+
+def flush_sync() -> None:
+    """
+    Blocks until every queued job history write has been committed.
+    Call this when an application must be stored before continuing (reads already do it implicitly).
+
+    Raises:
+        DataStorageError: If a background write failed since the last time an error was raised.
+    """
+    if _writer_thread is None:
+        return
+    _write_queue.put(_FLUSH_NOW)
+    _write_queue.join()
+    _raise_writer_error()
+
+
+def log_application(user_id: str, job_id: str, job_details: Dict[str, Any], status: str = "applied") -> None:
+    """
+    Logs a new job application for a user or updates an existing one if job_id matches.
+    job_id should be a unique identifier for the job posting (e.g., URL or a hash of it).
+    The row is committed in the background: call flush_sync() to wait for it. A failed commit is raised as
+    DataStorageError by the next flush_sync(), read or logging call.
+    """
+    ts = _now_iso()
+    details = _encode_details(user_id, job_details) # On the caller's thread, so bad data still raises here
+    _queue_history_writes(user_id, [(_UPSERT_SQL, (user_id, job_id, status, details, ts, ts))])
+    logger.info("Logged application for job_id %s for user %s.", job_id, user_id)
+
+
+def log_applications(user_id: str, applications: List[Dict[str, Any]]) -> None:
+    """
+    Logs several job applications for a user in a single transaction.
+    Equivalent to calling log_application for each item, in order, but with one write for the batch.
+
+    Args:
+        user_id (str): The user the applications belong to.
+        applications (List[Dict[str, Any]]): Items with "job_id", "details" and optionally "status"
+            (defaults to "applied").
+    """
+    if not applications:
+        return
+
+    ts = _now_iso()
+    statements = [
+        (_UPSERT_SQL, (
+            user_id, application["job_id"], application.get("status", "applied"),
+            _encode_details(user_id, application.get("details", {})), ts, ts
+        ))
+        for application in applications
+    ]
+    _queue_history_writes(user_id, statements)
+    logger.info("Logged %s applications for user %s.", len(statements), user_id)
 
 
 def update_application_status(user_id: str, job_id: str, new_status: str) -> bool:
     """
     Updates the status of a specific job application for a user.
-    Returns True if successful, False if the job_id was not found.
+    Returns True once the change is committed and synced to disk, False if the job_id was not found.
+    Raises DataStorageError if the change can't be committed.
     """
-    if not _initialized: initialize_storage()
+    flush_sync() # The job may still be queued
+    conn = _get_connection()
+    _ensure_migrated(user_id, conn)
+    try:
+        found = conn.execute("SELECT 1 FROM applications WHERE user_id = ? AND job_id = ?", (user_id, job_id)).fetchone()
+    except sqlite3.Error as e:
+        logger.error("Failed to look up job %s for user %s: %s", job_id, user_id, e, exc_info=True)
+        raise DataStorageError(f"Failed to read job history for user {user_id}: {e}")
+    if found is None:
+        logger.warning("Job ID %s not found in history for user %s. Could not update status.", job_id, user_id)
+        return False
 
-    history_file_path = os.path.join(JOB_HISTORY_DIR, f"{user_id}_job_applications.json")
-    raw_job_history_data = _read_json(history_file_path)
-    job_history: List[Dict[str, Any]] = []
+    # Status changes are the records users act on, so they are synced to disk before reporting success
+    _queue_history_writes(user_id, [(_UPDATE_STATUS_SQL, (new_status, _now_iso(), user_id, job_id))], durable=True)
+    flush_sync() # Raises if the commit failed
+    logger.info("Updated status for job %s to '%s' for user %s.", job_id, new_status, user_id)
+    return True
 
-    if isinstance(raw_job_history_data, list):
-        job_history = raw_job_history_data
-    elif isinstance(raw_job_history_data, dict) and "applications" in raw_job_history_data and isinstance(raw_job_history_data.get("applications"), list):
-        logger.info(f"Reading job history for user {user_id} (update_application_status) in old dictionary format.")
-        job_history = raw_job_history_data["applications"]
-    elif raw_job_history_data is None:
-        logger.warning(f"No job history found for user {user_id} when trying to update status for job {job_id}. Cannot update.")
-        return False
-    else:
-        logger.warning(f"Job history for user {user_id} (update_application_status) is in an unexpected format. Type: {type(raw_job_history_data)}. Cannot update.")
-        return False
+_HISTORY_FETCH_SIZE = 256 # Rows pulled from SQLite per fetchmany() while streaming a history
 
-    updated = False
-    for application in job_history:
-        if application.get("job_id") == job_id:
-            application["status"] = new_status
-            application["last_updated_status_at"] = datetime.datetime.now().isoformat()
-            updated = True
-            logger.info(f"Updated status for job {job_id} to '{new_status}' for user {user_id}.")
-            break
-
-    if updated:
-        _write_json(history_file_path, job_history) # Save the list directly
-        return True
-    else:
-        logger.warning(f"Job ID {job_id} not found in history for user {user_id}. Could not update status.")
-        return False
 
-def get_user_job_history(user_id: str) -> List[Dict[str, Any]]:
+def _since_iso(since: Union[str, datetime.datetime]) -> str:
+    """Normalizes a `since` bound to the UTC ISO 8601 form the timestamps are stored in (naive datetimes count as UTC)."""
+    if isinstance(since, str):
+        return since
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=datetime.timezone.utc)
+    return since.astimezone(datetime.timezone.utc).isoformat(timespec='seconds')
+
+
+def get_user_job_history(user_id: str, *, status: Optional[str] = None,
+                         since: Optional[Union[str, datetime.datetime]] = None,
+                         limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
     """
-    Retrieves the list of job applications for a user.
+    Yields a user's job applications, most recently applied first.
+    Filtering happens in the database, and rows are fetched in chunks as the caller iterates,
+    so looking for e.g. the interviews doesn't load the whole history.
+
+    Args:
+        user_id (str): The user whose applications to return.
+        status (Optional[str]): Only applications currently in this status.
+        since (Optional[Union[str, datetime.datetime]]): Only applications with applied_at at or after this time
+            (an ISO 8601 string as returned in "applied_at", or a datetime; naive datetimes are taken as UTC).
+        limit (Optional[int]): Yield at most this many applications.
+
+    Returns:
+        Iterator[Dict[str, Any]]: Application entries with "job_id", "details", "status", "applied_at"
+            and "last_updated_status_at". Nothing is read until iteration starts. Common detail values
+            (company, title, ...) are interned strings shared between entries; treat the entries as read-only.
+
+    Raises:
+        DataStorageError: If the database can't be read.
+    """
+    flush_sync()
+    conn = _get_connection()
+    _ensure_migrated(user_id, conn)
+
+    sql = ["SELECT job_id, status, details, applied_at, updated_at FROM applications WHERE user_id = ?"]
+    params: List[Any] = [user_id]
+    if status is not None:
+        sql.append("AND status = ?")
+        params.append(status)
+    if since is not None:
+        sql.append("AND applied_at >= ?")
+        params.append(_since_iso(since))
+    sql.append("ORDER BY applied_at DESC, rowid DESC") # rowid breaks ties within a batch: later logged first
+    if limit is not None:
+        sql.append("LIMIT ?")
+        params.append(limit)
+
+    try:
+        cursor = conn.execute(" ".join(sql), params)
+        cursor.arraysize = _HISTORY_FETCH_SIZE
+        n_rows = 0
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+            n_rows += len(rows)
+            for row in rows:
+                yield _row_to_entry(row)
+    except sqlite3.Error as e:
+        logger.error("Failed to read job history for user %s: %s", user_id, e, exc_info=True)
+        raise DataStorageError(f"Failed to read job history for user {user_id}: {e}")
+    logger.debug("Read %s job applications for user %s.", n_rows, user_id)
+
+
+def get_user_job_history_list(user_id: str) -> List[Dict[str, Any]]:
+    """
+    Retrieves the list of all job applications for a user, most recently applied first.
     Returns an empty list if no history is found.
     """
-    if not _initialized: initialize_storage()
-
-    history_file_path = os.path.join(JOB_HISTORY_DIR, f"{user_id}_job_applications.json")
-    raw_job_history_data = _read_json(history_file_path)
-
-    if isinstance(raw_job_history_data, list):
-        # New format: data is directly a list of applications
-        logger.info(f"Job history for user {user_id} loaded (list format). Count: {len(raw_job_history_data)}.")
-        return raw_job_history_data
-    elif isinstance(raw_job_history_data, dict) and "applications" in raw_job_history_data and isinstance(raw_job_history_data.get("applications"), list):
-        # Old format: data is a dict with an "applications" key
-        logger.info(f"Job history for user {user_id} loaded (dict format). Count: {len(raw_job_history_data['applications'])}.")
-        return raw_job_history_data["applications"]
-    elif raw_job_history_data is None:
-        logger.info(f"No job history found for user {user_id} at {history_file_path}.")
-        return []
-    else:
-        logger.warning(f"Job history for user {user_id} at {history_file_path} is in an unexpected format. Type: {type(raw_job_history_data)}. Returning empty list.")
+    history = list(get_user_job_history(user_id))
+    if not history:
+        logger.info("No job history found for user %s in %s.", user_id, _db_path())
         return []
+    logger.info("Job history for user %s loaded. Count: %s.", user_id, len(history))
+    return history
+
+def invalidate_cache(user_id: Optional[str] = None) -> None:
+    """
+    Drops cached profile data for a user, or for all users if user_id is None.
+    Only needed if the files can change without their size or mtime changing (e.g. in tests).
+    """
+    with _cache_lock:
+        if user_id is None:
+            _JSON_CACHE.clear()
+        else:
+            _JSON_CACHE.pop(_profile_path(user_id), None)
+
+
+def reinitialize(data_storage_path: str) -> None:
+    """
+    Points the job manager at a different data directory (e.g. one set at runtime, or a test's temp dir).
+    Writes out queued history writes and drops all caches, then initializes the new location.
+    Each thread's database connection reopens on the new database the next time it is used.
+
+    Args:
+        data_storage_path (str): Base directory; profiles and the applications database go in subdirectories of it.
+
+    Raises:
+        DataStorageError: If the new storage directories can't be created.
+    """
+    global _DATA_STORAGE_BASE_PATH, USER_DATA_DIR, JOB_HISTORY_DIR, _initialized
+    flush_sync()
+    with _cache_lock, _migration_lock:
+        _DATA_STORAGE_BASE_PATH = data_storage_path
+        USER_DATA_DIR = os.path.join(data_storage_path, "user_profiles")
+        JOB_HISTORY_DIR = os.path.join(data_storage_path, "job_applications")
+        _JSON_CACHE.clear()
+        _migrated_users.clear()
+        _profile_path.cache_clear()
+        _initialized = False
+    initialize_storage()
+
 
 # --- Example Usage (for testing) ---
 if __name__ == '__main__':
     import logging # Import logging for standalone testing
+    import tempfile
     # Setup basic logging for testing this module standalone
     logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s')
 
     logger.info("--- Job Manager Standalone Test ---")
 
-    # Ensure storage is initialized (creates directories)
+    # Run against a fresh temporary directory so the test never touches (or depends on) the real data
     try:
-        initialize_storage()
+        reinitialize(tempfile.mkdtemp(prefix="job_manager_test_"))
         logger.info(f"Data storage base path: {_DATA_STORAGE_BASE_PATH}")
         logger.info(f"User profiles directory: {USER_DATA_DIR}")
         logger.info(f"Job applications directory: {JOB_HISTORY_DIR}")
     except DataStorageError as e:
         logger.critical(f"Failed to initialize storage for testing: {e}")
-        exit(1) # Cannot proceed with tests if storage can't be initialized
+        sys.exit(1) # Cannot proceed with tests if storage can't be initialized
 
     test_user_id = "test_user_123"
 
@@ -290,18 +802,24 @@ if __name__ == '__main__':
     log_application(test_user_id, "openai_job1", job1_details, status="interested")
     log_application(test_user_id, "google_job2", job2_details, status="applied")
 
+    # Batch logging: one append for several applications
+    log_applications(test_user_id, [
+        {"job_id": "meta_job3", "details": {"title": "ML Engineer", "company": "Meta"}},
+        {"job_id": "google_job2", "details": job2_details, "status": "applied"},
+    ])
+
     # Log same job again to test update within log_application
     log_application(test_user_id, "openai_job1", {"title": "AI Developer (Senior)", "company": "OpenAI", "url": "https://openai.com/careers/1"}, status="applied_via_agent")
 
 
     # 3. Test Get Job History
     logger.info(f"\n--- Testing Get Job History for {test_user_id} ---")
-    history = get_user_job_history(test_user_id)
+    history = get_user_job_history_list(test_user_id)
     if history:
         logger.info(f"Found {len(history)} applications in history.")
         for app in history:
             logger.info(f"  Job: {app.get('job_id')}, Status: {app.get('status')}, Details: {app.get('details', {}).get('title')}")
-        assert len(history) == 2 # Should be 2 unique job_ids
+        assert len(history) == 3 # Should be 3 unique job_ids
     else:
         logger.error("Failed to retrieve job history or history is empty.")
 
@@ -321,7 +839,7 @@ if __name__ == '__main__':
 
     # Verify updated history
     logger.info(f"\n--- Verifying Updated Job History for {test_user_id} ---")
-    updated_history = get_user_job_history(test_user_id)
+    updated_history = get_user_job_history_list(test_user_id)
     if updated_history:
         for app in updated_history:
             if app.get("job_id") == "google_job2":
@@ -331,6 +849,11 @@ if __name__ == '__main__':
                  assert app.get("status") == "applied_via_agent" # Check update from log_application
                  logger.info(f"  Verified status for openai_job1: {app.get('status')}")
 
+    # Filtered query: only the matching rows are read from the database
+    interviews = list(get_user_job_history(test_user_id, status="interview_scheduled"))
+    assert [app["job_id"] for app in interviews] == ["google_job2"]
+    logger.info(f"Applications with an interview scheduled: {len(interviews)}")
+
     # 5. Test non-existent user profile and history
     logger.info(f"\n--- Testing Non-Existent User ---")
     non_existent_user_id = "ghost_user_000"
@@ -338,10 +861,22 @@ if __name__ == '__main__':
     assert ghost_profile is None
     logger.info(f"Loading profile for '{non_existent_user_id}' correctly returned None: {ghost_profile is None}")
 
-    ghost_history = get_user_job_history(non_existent_user_id)
+    ghost_history = get_user_job_history_list(non_existent_user_id)
     assert ghost_history == []
     logger.info(f"Loading job history for '{non_existent_user_id}' correctly returned empty list: {ghost_history == []}")
 
+    # 6. Test migration of a file-based history, using a copy of the sample so the sample itself is never renamed
+    logger.info(f"\n--- Testing Migration of a File-Based History ---")
+    import shutil
+    sample_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'samples', 'job_applications', "test_user_123_job_applications.json")
+    legacy_user_id = "legacy_user_456"
+    shutil.copyfile(sample_path, _legacy_paths(legacy_user_id)[0])
+    migrated_history = get_user_job_history_list(legacy_user_id)
+    assert len(migrated_history) == 2
+    assert all(app["applied_at"].endswith("+00:00") for app in migrated_history) # Naive local times became UTC
+    assert os.path.exists(f"{_legacy_paths(legacy_user_id)[0]}.migrated") and os.path.exists(sample_path)
+    logger.info(f"Migrated {len(migrated_history)} applications for '{legacy_user_id}'.")
+
 
     logger.info("\n--- Job Manager Standalone Test Complete ---")
     logger.info(f"Please check the contents of the '{_DATA_STORAGE_BASE_PATH}' directory.")
@@ -0,0 +1,320 @@
+import collections
+import hashlib
+import time
+from typing import Dict, List, Optional, Protocol, Sequence, Tuple
+
+from job_application_agent import config
+from job_application_agent.core_modules.error_handler import ConfigError, get_logger
+
+try:
+    import redis.asyncio as redis_asyncio # Optional; only needed for the shared Redis backend
+except ImportError:
+    redis_asyncio = None
+
+try:
+    import numpy as np # Optional; the semantic cache is disabled without it
+except ImportError:
+    np = None
+
+logger = get_logger(__name__)
+
+# --- Defaults (overridable in config.py) ---
+_DEFAULT_MAX_ENTRIES = 1024
+_DEFAULT_TTL_SECONDS = 24 * 60 * 60
+_DEFAULT_SEMANTIC_MAX_ENTRIES = 5000
+_DEFAULT_SEMANTIC_THRESHOLD = 0.92
+_DEFAULT_SEMANTIC_MAX_NAMESPACES = 1000
+
+
+# --- Backends ---
+class CacheBackend(Protocol):
+    """Async key/value store for LLM responses. Keys and values are str; ttl is in seconds."""
+
+    async def get(self, key: str) -> Optional[str]: ...
+
+    async def set(self, key: str, value: str, ttl: int) -> None: ...
+
+    async def delete(self, key: str) -> None: ...
+
+
+class LRUCacheBackend:
+    """
+    In-process cache holding up to max_entries responses, least recently used evicted first.
+    Entries also expire after their ttl. Not shared between processes; lost on restart.
+    """
+
+    def __init__(self, max_entries: int = _DEFAULT_MAX_ENTRIES):
+        self._entries: "collections.OrderedDict[str, Tuple[float, str]]" = collections.OrderedDict()
+        self._max_entries = max_entries
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """Cache shared between processes (and restarts) in Redis, using Redis' own key expiry for the ttl."""
+
+    def __init__(self, url: str, key_prefix: str = "llm_cache:"):
+        if redis_asyncio is None:
+            raise ConfigError("LLM_CACHE_REDIS_URL is set but the 'redis' package is not installed.")
+        self._client = redis_asyncio.from_url(url, decode_responses=True)
+        self._key_prefix = key_prefix
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._client.get(self._key_prefix + key)
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await self._client.set(self._key_prefix + key, value, ex=ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(self._key_prefix + key)
+
+
+# --- Cache Front End ---
+class CacheStats:
+    """Hit/miss counters for an LLMCache."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __repr__(self) -> str:
+        return f"CacheStats(hits={self.hits}, misses={self.misses}, hit_rate={self.hit_rate:.2f})"
+
+
+class LLMCache:
+    """
+    Caches LLM response text by model and prompt on top of a CacheBackend, counting hits and misses.
+    Backend failures (e.g. Redis unreachable) are logged and treated as misses: the cache must never
+    be the reason an LLM call fails.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int = _DEFAULT_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.stats = CacheStats()
+
+    @staticmethod
+    def cache_key(model_name: str, prompt_text: str) -> str:
+        """SHA-256 of the model name and the exact prompt text."""
+        return hashlib.sha256(f"{model_name}\0{prompt_text}".encode('utf-8')).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed, treating it as a miss: {e}")
+            value = None
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        try:
+            await self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            logger.warning(f"LLM cache store failed, response not cached: {e}")
+
+    async def delete(self, key: str) -> None:
+        try:
+            await self.backend.delete(key)
+        except Exception as e:
+            logger.warning(f"LLM cache delete failed: {e}")
+
+
+# --- Semantic Cache ---
+# Exact keys miss prompts that differ only in wording ("Python Software Engineer" vs "Software Engineer, Python").
+# The semantic cache compares prompt embeddings instead: a prompt whose embedding has cosine similarity of at
+# least the threshold with an earlier prompt gets that prompt's response. Vectors are L2-normalized on insert,
+# so the similarity against every stored prompt is one matrix-vector product. Entries are kept per namespace
+# (per model, prompt kind and, for personalised prompts, user), so e.g. a job-fit prompt can never match a
+# cover letter prompt, nor one user's prompt another's. The least recently used namespaces are dropped first.
+class _SemanticIndex:
+    """Normalized embeddings and their responses for one namespace; the oldest entry is overwritten once full."""
+
+    def __init__(self, dim: int, max_entries: int):
+        self.vectors = np.empty((min(8, max_entries), dim), dtype=np.float32) # Small: most namespaces are one user's
+        self.responses: List[str] = []
+        self.max_entries = max_entries
+        self.next_slot = 0 # Where the next entry goes once the index is full
+
+    def add(self, vector: "np.ndarray", response: str) -> None:
+        n = len(self.responses)
+        if n < self.max_entries:
+            if n == len(self.vectors): # Grow by doubling, so inserts stay amortized O(1)
+                grown = np.empty((min(2 * n, self.max_entries), self.vectors.shape[1]), dtype=np.float32)
+                grown[:n] = self.vectors
+                self.vectors = grown
+            self.vectors[n] = vector
+            self.responses.append(response)
+        else:
+            self.vectors[self.next_slot] = vector
+            self.responses[self.next_slot] = response
+            self.next_slot = (self.next_slot + 1) % self.max_entries
+
+    def best_match(self, vector: "np.ndarray") -> Tuple[float, int]:
+        """Returns (cosine similarity, index) of the stored entry closest to vector."""
+        scores = self.vectors[:len(self.responses)] @ vector
+        best = int(np.argmax(scores))
+        return float(scores[best]), best
+
+
+class SemanticCache:
+    """
+    In-process cache of LLM responses looked up by prompt embedding similarity (see above).
+    Meant for a few thousand entries per namespace and up to max_namespaces namespaces; requires numpy.
+    """
+
+    def __init__(self, max_entries: int = _DEFAULT_SEMANTIC_MAX_ENTRIES, threshold: float = _DEFAULT_SEMANTIC_THRESHOLD,
+                 max_namespaces: int = _DEFAULT_SEMANTIC_MAX_NAMESPACES):
+        if np is None:
+            raise ConfigError("The semantic LLM cache requires the 'numpy' package.")
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.max_namespaces = max_namespaces
+        self.stats = CacheStats()
+        self._indexes: "collections.OrderedDict[str, _SemanticIndex]" = collections.OrderedDict()
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> Optional["np.ndarray"]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else None
+
+    def lookup(self, namespace: str, embedding: Sequence[float], threshold: Optional[float] = None) -> Optional[str]:
+        """
+        Returns the response stored for the most similar prompt in namespace, if its cosine similarity
+        to embedding is at least threshold (default: the cache's threshold); otherwise None.
+        """
+        index = self._indexes.get(namespace)
+        vector = self._normalize(embedding)
+        if index is None or vector is None or not index.responses or vector.shape[0] != index.vectors.shape[1]:
+            self.stats.misses += 1
+            return None
+        self._indexes.move_to_end(namespace)
+        score, best = index.best_match(vector)
+        if score >= (self.threshold if threshold is None else threshold):
+            self.stats.hits += 1
+            logger.debug("Semantic cache hit in '%s' with similarity %.3f.", namespace, score)
+            return index.responses[best]
+        self.stats.misses += 1
+        return None
+
+    def add(self, namespace: str, embedding: Sequence[float], response: str) -> None:
+        """Stores response under the prompt embedding in namespace."""
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        index = self._indexes.get(namespace)
+        if index is None or vector.shape[0] != index.vectors.shape[1]: # New namespace, or the embedding model changed
+            index = self._indexes[namespace] = _SemanticIndex(vector.shape[0], self.max_entries)
+            if len(self._indexes) > self.max_namespaces:
+                self._indexes.popitem(last=False)
+        self._indexes.move_to_end(namespace)
+        index.add(vector, response)
+
+
+def create_cache_from_config() -> LLMCache:
+    """
+    Builds the response cache described by config.py: a RedisCacheBackend if LLM_CACHE_REDIS_URL is set,
+    otherwise an in-process LRUCacheBackend with LLM_CACHE_MAX_ENTRIES entries. LLM_CACHE_TTL_SECONDS
+    sets the ttl for both (default 24 hours).
+
+    Raises:
+        ConfigError: If a Redis URL is configured but the redis package is missing.
+    """
+    ttl = getattr(config, 'LLM_CACHE_TTL_SECONDS', _DEFAULT_TTL_SECONDS)
+    redis_url = getattr(config, 'LLM_CACHE_REDIS_URL', None)
+    if redis_url:
+        logger.info("Using Redis for the LLM response cache.")
+        return LLMCache(RedisCacheBackend(redis_url), ttl=ttl)
+    max_entries = getattr(config, 'LLM_CACHE_MAX_ENTRIES', _DEFAULT_MAX_ENTRIES)
+    return LLMCache(LRUCacheBackend(max_entries), ttl=ttl)
+
+
+def create_semantic_cache_from_config() -> Optional[SemanticCache]:
+    """
+    Builds the semantic cache described by config.py (LLM_SEMANTIC_CACHE_MAX_ENTRIES, LLM_SEMANTIC_CACHE_THRESHOLD,
+    LLM_SEMANTIC_CACHE_MAX_NAMESPACES),
+    or returns None if it is turned off (LLM_SEMANTIC_CACHE_ENABLED = False) or numpy isn't installed.
+    """
+    if not getattr(config, 'LLM_SEMANTIC_CACHE_ENABLED', True):
+        return None
+    if np is None:
+        logger.info("numpy is not installed; the semantic LLM cache is disabled.")
+        return None
+    return SemanticCache(
+        max_entries=getattr(config, 'LLM_SEMANTIC_CACHE_MAX_ENTRIES', _DEFAULT_SEMANTIC_MAX_ENTRIES),
+        threshold=getattr(config, 'LLM_SEMANTIC_CACHE_THRESHOLD', _DEFAULT_SEMANTIC_THRESHOLD),
+        max_namespaces=getattr(config, 'LLM_SEMANTIC_CACHE_MAX_NAMESPACES', _DEFAULT_SEMANTIC_MAX_NAMESPACES)
+    )
+
+
+# --- Example Usage (for testing) ---
+if __name__ == '__main__':
+    import asyncio
+
+    async def main_test():
+        print("--- llm_cache.py standalone test ---")
+        cache = LLMCache(LRUCacheBackend(max_entries=2), ttl=60)
+        key_a = LLMCache.cache_key("gemini-1.5-flash-latest", "prompt A")
+        key_b = LLMCache.cache_key("gemini-1.5-flash-latest", "prompt B")
+        key_c = LLMCache.cache_key("gemini-1.5-flash-latest", "prompt C")
+
+        assert await cache.get(key_a) is None
+        await cache.set(key_a, "response A")
+        assert await cache.get(key_a) == "response A"
+
+        # Filling past max_entries evicts the least recently used entry (B; A was just read)
+        await cache.set(key_b, "response B")
+        await cache.get(key_a)
+        await cache.set(key_c, "response C")
+        assert await cache.get(key_b) is None
+        assert await cache.get(key_a) == "response A"
+
+        await cache.delete(key_a)
+        assert await cache.get(key_a) is None
+        print(f"Stats: {cache.stats}")
+
+        if np is not None:
+            semantic = SemanticCache(max_entries=2, threshold=0.9)
+            semantic.add("fit", [1.0, 0.0, 0.1], "fit response")
+            assert semantic.lookup("fit", [0.9, 0.0, 0.1]) == "fit response" # Nearly the same direction
+            assert semantic.lookup("fit", [0.0, 1.0, 0.0]) is None
+            assert semantic.lookup("snippet", [1.0, 0.0, 0.1]) is None # Other namespaces never match
+            bounded = SemanticCache(max_namespaces=2)
+            for namespace in ("fit:user1", "fit:user2", "fit:user3"):
+                bounded.add(namespace, [1.0, 0.0], namespace)
+            assert bounded.lookup("fit:user1", [1.0, 0.0]) is None # Least recently used namespace dropped
+            assert bounded.lookup("fit:user3", [1.0, 0.0]) == "fit:user3"
+            print(f"Semantic stats: {semantic.stats}")
+        print("--- llm_cache.py standalone test complete ---")
+
+    asyncio.run(main_test())
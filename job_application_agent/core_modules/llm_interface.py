@@ -1,28 +1,83 @@
+import asyncio
+import dataclasses
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Optional, TypedDict, Union
+
 import google.generativeai as genai
 from google.generativeai.types import GenerationConfig # For more specific generation settings
 from google.api_core import exceptions as google_exceptions # For specific API errors
 
 from job_application_agent import config
 from job_application_agent.core_modules.error_handler import LLMInterfaceError, ConfigError, get_logger
+from job_application_agent.utils import json_dumps, json_loads
+from job_application_agent.core_modules.llm_cache import (
+    LLMCache, SemanticCache, create_cache_from_config, create_semantic_cache_from_config
+)
 
 # Initialize logger for this module
 logger = get_logger(__name__)
 
-# Global variable for the generative model
+# Model tiers: each task uses the cheapest model that handles it well. Override a tier's model in config.py
+# (GEMINI_MODEL_TIERS = {"fast": "..."}) or, e.g. for A/B rollouts, with an environment variable such as
+# GEMINI_MODEL_FAST, which takes precedence.
+_DEFAULT_MODEL_TIERS = {
+    "heavy": "gemini-1.5-pro",
+    "standard": "gemini-1.5-flash-latest",
+    "fast": "gemini-1.5-flash-8b",
+}
+_ANALYZE_CV_TIER = "standard"
+_QUESTIONS_TIER = "fast"
+_SNIPPET_TIER = "standard"
+_FIT_TIER = "fast" # One call per job, so by far the largest share of requests
+
+# Global variables for the generative models, one per tier
 # It's good practice to initialize this once.
-_model = None
+_models: dict = {}
+_model = None # The "standard" tier model; also tells whether the client is configured
+
+# Responses keyed by model and exact prompt text, so repeated prompts don't go back to the API.
+# Set up by configure_genai_client(); response_cache.stats counts hits and misses.
+response_cache: LLMCache = None
+
+# Responses looked up by prompt embedding similarity, for prompts built from free-form job descriptions
+# where near-duplicates are common. Only used by calls that opt in with cache_mode="semantic".
+# None if numpy isn't installed or it is turned off in config.py.
+semantic_cache: SemanticCache = None
+_EMBEDDING_MODEL = "models/text-embedding-004"
+
+_warmed_up = False # Set by warm_up_client()
+_last_api_call = 0.0 # time.monotonic() of the latest generate or warm-up request
+_DEFAULT_CONNECTION_IDLE_SECONDS = 300 # After this long without requests, rewarm_connection_if_idle() reconnects
+_configure_lock = threading.Lock() # Serializes configure_genai_client()
+
+# Tasks answering requests that are currently in flight, by request key (see _send_prompt_async)
+_inflight: dict = {}
 
 def configure_genai_client():
     """
     Configures the Google Generative AI client with the API key from config.py
-    and initializes the generative model.
-    Should be called once at application startup.
+    and initializes the generative model for each tier.
+    Should be called once at application startup; later calls do nothing. Safe to call from several
+    threads at once: only the first one configures the client.
     """
-    global _model
     if _model:
         logger.info("Gemini client already configured.")
         return
 
+    with _configure_lock:
+        if _model: # Configured by another thread while this one waited for the lock
+            return
+        _configure_genai_client_locked()
+
+
+def _configure_genai_client_locked():
+    global _models, _model, response_cache, semantic_cache
     try:
         api_key = getattr(config, 'GEMINI_API_KEY', None)
         if not api_key or api_key == "YOUR_GEMINI_API_KEY_HERE":
@@ -30,8 +85,15 @@ def configure_genai_client():
             raise ConfigError("GEMINI_API_KEY is missing or not set in the configuration.")
 
         genai.configure(api_key=api_key)
-        _model = genai.GenerativeModel('gemini-1.5-flash-latest') # Using the specified model
-        logger.info("Google Generative AI client configured successfully with gemini-1.5-flash-latest.")
+        model_names = _model_tier_names()
+        models = {tier: genai.GenerativeModel(model_name) for tier, model_name in model_names.items()}
+        if response_cache is None:
+            response_cache = create_cache_from_config()
+            semantic_cache = create_semantic_cache_from_config()
+        # _model is what the unlocked fast path checks, so it is published last, once everything else is set up
+        _models = models
+        _model = models["standard"]
+        logger.info(f"Google Generative AI client configured successfully with models {model_names}.")
 
     except ConfigError as e:
         # Re-raise ConfigError to be caught by the main application setup
@@ -42,75 +104,326 @@ def configure_genai_client():
         raise LLMInterfaceError(f"An unexpected error occurred during Gemini client configuration: {e}")
 
 
-async def _send_prompt_async(prompt_text: str, generation_config_override: GenerationConfig = None) -> str:
+def _ensure_configured():
+    """Configures the client on first use if configure_genai_client() wasn't called at startup."""
+    if _model is None:
+        configure_genai_client()
+
+
+def _model_tier_names() -> dict:
+    """Returns the tier -> model name mapping: defaults, then config.py's GEMINI_MODEL_TIERS, then GEMINI_MODEL_<TIER> env vars."""
+    model_names = dict(_DEFAULT_MODEL_TIERS)
+    model_names.update(getattr(config, 'GEMINI_MODEL_TIERS', None) or {})
+    for tier in model_names:
+        env_value = os.environ.get(f"GEMINI_MODEL_{tier.upper()}")
+        if env_value:
+            model_names[tier] = env_value
+    return model_names
+
+
+async def warm_up_client() -> None:
     """
-    Sends a prompt to the configured Gemini model and returns the response text.
+    Sends one cheap request (a token count) so the connection to the Gemini API, including its TLS handshake,
+    is already established when the first real request arrives. Call it once at startup, after
+    configure_genai_client(); later calls do nothing. Failures are only logged: the first real request
+    simply connects itself.
+    """
+    global _warmed_up
+    if _warmed_up:
+        return
+    _ensure_configured()
+    _warmed_up = True
+    if await _ping():
+        logger.info("Gemini client connection warmed up.")
+
+
+async def rewarm_connection_if_idle() -> None:
+    """
+    Like warm_up_client(), but for a running bot: if no request has gone to the API for
+    LLM_CONNECTION_IDLE_SECONDS (the connection may have been closed as idle meanwhile), sends the cheap
+    request again. Meant to run alongside work that precedes an LLM call, such as parsing an uploaded CV,
+    so a reconnect overlaps with that work. Failures are only logged.
+    """
+    global _last_api_call
+    if time.monotonic() - _last_api_call < getattr(config, 'LLM_CONNECTION_IDLE_SECONDS', _DEFAULT_CONNECTION_IDLE_SECONDS):
+        return
+    _ensure_configured()
+    _last_api_call = time.monotonic() # Before awaiting, so concurrent callers don't ping as well
+    if await _ping():
+        logger.debug("Gemini client connection rewarmed after being idle.")
+
+
+async def _ping() -> bool:
+    """Sends a token count request, which costs no generation quota; returns whether it succeeded."""
+    global _last_api_call
+    try:
+        await _model.count_tokens_async("ping")
+        _last_api_call = time.monotonic()
+        return True
+    except Exception as e:
+        logger.warning(f"Gemini client warm-up request failed (the first request will connect instead): {e}")
+        return False
+
+
+def _is_cacheable(generation_config: GenerationConfig) -> bool:
+    """Only requests at the model's default temperature, or an explicit temperature of 0, are cached."""
+    if generation_config is None:
+        return True
+    if isinstance(generation_config, dict):
+        return generation_config.get('temperature') in (None, 0)
+    return getattr(generation_config, 'temperature', None) in (None, 0)
+
+
+async def _embed_prompt(prompt_text: str):
+    """Returns the embedding of prompt_text for the semantic cache, or None if it can't be computed."""
+    try:
+        result = await genai.embed_content_async(model=_EMBEDDING_MODEL, content=prompt_text)
+        return result['embedding']
+    except Exception as e: # The cache is an optimization; never fail the actual request over it
+        logger.warning(f"Failed to embed prompt for the semantic cache: {e}")
+        return None
+
+
+async def _send_prompt_async(prompt_text: str, generation_config_override: GenerationConfig = None,
+                             cache_mode: str = "exact", cache_namespace: str = None, model_tier: str = "standard",
+                             parse: Callable[[str], Any] = None, cacheable: Callable[[Any], bool] = None) -> Any:
+    """
+    Sends a prompt to the configured Gemini model and returns the response text, or parse(response text).
+    A prompt that was already answered (same model, same text) is served from response_cache
+    without calling the API, unless generation_config_override asks for a nonzero temperature.
+    Only responses that parse (and that weren't cut short by MAX_TOKENS) are cached, so an unusable
+    answer is never replayed from the cache.
     This is an asynchronous version.
 
     Args:
         prompt_text (str): The text of the prompt to send to the model.
         generation_config_override (GenerationConfig, optional): Specific generation settings
             to override the model's default.
+        cache_mode (str, optional): "exact" (default) only reuses responses to the identical prompt.
+            "semantic" also reuses the response to a sufficiently similar earlier prompt of the same
+            cache_namespace; only for prompts where a near-duplicate's answer is acceptable.
+        cache_namespace (str, optional): Which prompts may share responses; required for "semantic". Per-user prompts
+            must include the user (see _semantic_namespace()), so only prompts about the same CV can match.
+        model_tier (str, optional): "heavy", "standard" (default) or "fast"; which model answers the prompt.
+        parse (Callable[[str], Any], optional): Parses and validates the response text, raising LLMInterfaceError
+            if it can't be used. Applied to cached responses too; a cached response that fails it counts as a miss.
+        cacheable (Callable[[Any], bool], optional): Given parse's result, whether the response may be cached
+            (e.g. False when part of it was invalid). By default every parsed response is.
 
     Returns:
-        str: The text part of the model's response.
+        The text part of the model's response, or what parse returned for it.
 
     Raises:
         LLMInterfaceError: If the model is not configured, or if there's an API error,
-                           or if the response is blocked or doesn't contain text.
+                           or if the response is blocked, doesn't contain text or fails parse.
     """
     if not _model:
         logger.error("Gemini model not configured. Call configure_genai_client() first.")
         raise LLMInterfaceError("Gemini model is not configured.")
+    model = _models.get(model_tier)
+    if model is None:
+        raise LLMInterfaceError(f"Unknown model tier: {model_tier}")
+
+    if not _is_cacheable(generation_config_override): # Sampled output: every call gets its own answer
+        response_text, _ = await _generate_async(model, prompt_text, generation_config_override)
+        return parse(response_text) if parse else response_text
+
+    request_key = LLMCache.cache_key(model.model_name, prompt_text)
+    if response_cache is not None:
+        cached_text = await response_cache.get(request_key)
+        if cached_text is not None:
+            hit, value = _parse_cached(cached_text, parse)
+            if hit:
+                logger.debug("Gemini response served from cache. Length: %d", len(cached_text))
+                return value
+
+    # Single flight: concurrent callers with the same prompt share one API call instead of each making
+    # their own before the first answer reaches the cache. The call runs as its own task, which every caller
+    # (the first one included) awaits through asyncio.shield: a caller that is cancelled, e.g. because its
+    # handler timed out, stops waiting without cancelling the request for the others. The event loop is
+    # single-threaded, so the check-then-insert below needs no lock.
+    # The task returns the text along with the first caller's parsed value; the other callers parse the text
+    # themselves, so no two callers share a (mutable) result.
+    task = _inflight.get(request_key)
+    is_first_caller = task is None
+    if is_first_caller:
+        task = asyncio.ensure_future(_answer_prompt(
+            model, prompt_text, generation_config_override, request_key, cache_mode, cache_namespace, parse, cacheable
+        ))
+        _inflight[request_key] = task
+        task.add_done_callback(lambda done: _finish_inflight(request_key, done))
+    else:
+        logger.debug("Joining an identical in-flight Gemini request.")
+    response_text, value = await asyncio.shield(task)
+    if is_first_caller or not parse:
+        return value
+    return parse(response_text)
+
+
+def _parse_cached(cached_text: str, parse: Optional[Callable[[str], Any]]) -> tuple[bool, Any]:
+    """Returns (True, parsed value) for a usable cached response, or (False, None) if it no longer passes parse."""
+    if not parse:
+        return True, cached_text
+    try:
+        return True, parse(cached_text)
+    except LLMInterfaceError as e:
+        logger.warning(f"Ignoring cached Gemini response that can't be used: {e}")
+        return False, None
 
-    logger.debug(f"Sending prompt to Gemini: '{prompt_text[:100]}...'") # Log a snippet
 
-    try:
-        # Using generate_content_async for non-blocking calls
-        response = await _model.generate_content_async(
-            prompt_text,
-            generation_config=generation_config_override
-            # safety_settings=... # Consider adding safety settings if needed
-        )
+def _finish_inflight(request_key: str, task: asyncio.Task) -> None:
+    """Done callback of a shared request: unregisters it and marks its exception retrieved (every waiter may be gone)."""
+    if _inflight.get(request_key) is task:
+        del _inflight[request_key]
+    if not task.cancelled():
+        task.exception()
 
-        # Accessing the text directly if available, otherwise checking parts.
-        # Based on Gemini API, response.text should be the primary way for simple text.
-        # response.parts might contain more complex data structures if the prompt requested it (e.g. function calls)
-        # For simple text generation, response.text should be sufficient.
-
-        if response.candidates:
-            # Iterate through candidates (usually one for basic prompts)
-            # Check for finish_reason
-            for candidate in response.candidates:
-                if candidate.finish_reason == 'STOP' and candidate.content and candidate.content.parts:
-                    full_text = "".join(part.text for part in candidate.content.parts if hasattr(part, 'text'))
-                    if full_text:
-                        logger.debug(f"Gemini response received successfully. Length: {len(full_text)}")
-                        return full_text
-                elif candidate.finish_reason == 'MAX_TOKENS':
-                    logger.warning("Gemini response truncated due to MAX_TOKENS.")
-                    # Return truncated text if available
-                    full_text = "".join(part.text for part in candidate.content.parts if hasattr(part, 'text'))
-                    if full_text: return full_text
-                elif candidate.finish_reason in ['SAFETY', 'RECITATION']:
-                    logger.error(f"Gemini response blocked due to: {candidate.finish_reason}")
-                    # Log safety ratings if available
-                    if candidate.safety_ratings:
-                        for rating in candidate.safety_ratings:
-                            logger.error(f"Safety Rating: Category={rating.category}, Probability={rating.probability}")
-                    raise LLMInterfaceError(f"Gemini prompt blocked due to {candidate.finish_reason}.")
-                else: # Other finish reasons like 'OTHER' or 'UNSPECIFIED'
-                    logger.error(f"Gemini generation stopped due to an unexpected reason: {candidate.finish_reason}")
-                    raise LLMInterfaceError(f"Gemini generation failed with reason: {candidate.finish_reason}")
-
-        # Fallback if response.text is not directly available or if candidates structure is different than expected
-        if hasattr(response, 'text') and response.text:
-            logger.debug(f"Gemini response received (via .text attribute). Length: {len(response.text)}")
-            return response.text
-
-        logger.error(f"No valid text content found in Gemini response. Response: {response}")
-        raise LLMInterfaceError("No valid text content received from Gemini.")
 
+async def _answer_prompt(model, prompt_text: str, generation_config_override: GenerationConfig, request_key: str,
+                         cache_mode: str, cache_namespace: str, parse: Optional[Callable[[str], Any]],
+                         cacheable: Optional[Callable[[Any], bool]]) -> tuple[str, Any]:
+    """
+    Answers a deterministic prompt that missed the exact cache: semantic cache, then the API.
+    Returns (response text, parsed value); the response is cached once it has parsed.
+    """
+    embedding = None
+    if cache_mode == "semantic" and semantic_cache is not None:
+        namespace = f"{model.model_name}:{cache_namespace}"
+        embedding = await _embed_prompt(prompt_text)
+        if embedding is not None:
+            cached_text = semantic_cache.lookup(namespace, embedding)
+            if cached_text is not None:
+                hit, value = _parse_cached(cached_text, parse)
+                if hit:
+                    logger.debug("Gemini response served from semantic cache. Length: %d", len(cached_text))
+                    return cached_text, value
+
+    response_text, truncated = await _generate_async(model, prompt_text, generation_config_override)
+    value = parse(response_text) if parse else response_text # Raises for an unusable response, before it is cached
+    if truncated or (cacheable is not None and not cacheable(value)):
+        return response_text, value
+    if response_cache is not None:
+        await response_cache.set(request_key, response_text)
+    if embedding is not None:
+        semantic_cache.add(namespace, embedding, response_text)
+    return response_text, value
+
+
+# --- Rate Limiting & Retries ---
+# All generate requests share one token bucket sized to the API quota (LLM_REQUESTS_PER_MINUTE in config.py),
+# so a large batch waits for capacity instead of running into 429s. Requests that still fail with a transient
+# error (quota exhausted, overloaded or timed-out backend) are retried with exponential backoff and full jitter;
+# other API errors (bad request, permission denied, ...) fail immediately.
+_DEFAULT_REQUESTS_PER_MINUTE = 500
+_MAX_ATTEMPTS = 6
+_RETRY_BASE_DELAY = 1.0 # Seconds; doubles per attempt
+_RETRY_MAX_DELAY = 30.0
+_RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,   # 429
+    google_exceptions.TooManyRequests,     # 429 (REST)
+    google_exceptions.InternalServerError, # 500
+    google_exceptions.ServiceUnavailable,  # 503
+    google_exceptions.DeadlineExceeded,    # 504
+)
+
+
+class _AsyncRateLimiter:
+    """Token bucket for asyncio: bursts of up to `rate` acquisitions, refilled evenly over `period` seconds."""
+
+    def __init__(self, rate: float, period: float = 60.0):
+        self._capacity = rate
+        self._tokens = rate
+        self._fill_rate = rate / period
+        self._last_refill = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._last_refill) * self._fill_rate)
+            self._last_refill = now
+            if self._tokens >= 1: # No await between the check and the decrement, so this is race-free
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self._fill_rate)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+_rate_limiter = _AsyncRateLimiter(getattr(config, 'LLM_REQUESTS_PER_MINUTE', _DEFAULT_REQUESTS_PER_MINUTE))
+
+
+async def _generate_with_retries(model, prompt_text: str, generation_config_override: GenerationConfig = None, stream: bool = False):
+    """
+    Rate-limited generate_content_async call, retrying transient API errors (see above). With stream=True
+    only opening the stream is retried; an error part way through would otherwise repeat the text already sent.
+    """
+    global _last_api_call
+    for attempt in range(1, _MAX_ATTEMPTS + 1):
+        try:
+            async with _rate_limiter:
+                _last_api_call = time.monotonic()
+                # Using generate_content_async for non-blocking calls
+                return await model.generate_content_async(
+                    prompt_text,
+                    generation_config=generation_config_override,
+                    stream=stream
+                    # safety_settings=... # Consider adding safety settings if needed
+                )
+        except _RETRYABLE_ERRORS as e:
+            if attempt == _MAX_ATTEMPTS:
+                raise
+            delay = random.uniform(0, min(_RETRY_MAX_DELAY, _RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+            logger.warning(f"Transient Gemini API error ({type(e).__name__}); retrying in {delay:.1f}s (attempt {attempt}/{_MAX_ATTEMPTS}).")
+            await asyncio.sleep(delay)
+
+
+async def _generate_async(model, prompt_text: str, generation_config_override: GenerationConfig = None) -> tuple[str, bool]:
+    """
+    Calls the Gemini API for _send_prompt_async and extracts the response text.
+    Returns (text, truncated), where truncated means generation stopped at the MAX_TOKENS limit.
+    """
+    # Lazy %-formatting: nothing is formatted unless DEBUG is enabled, and %.100s logs a snippet without slicing
+    logger.debug("Sending prompt to Gemini (%s): '%.100s...'", model.model_name, prompt_text)
+
+    try:
+        response = await _generate_with_retries(model, prompt_text, generation_config_override)
+
+        # These prompts ask for a single candidate (the default), so only the first one is looked at
+        candidate = response.candidates[0] if response.candidates else None
+        if candidate is None: # e.g. the prompt itself was blocked
+            block_reason = getattr(getattr(response, 'prompt_feedback', None), 'block_reason', None)
+            logger.error(f"No candidates in Gemini response. Prompt block reason: {block_reason}")
+            raise LLMInterfaceError("No valid text content received from Gemini.")
+
+        # finish_reason is a FinishReason enum in the client library; compare by name
+        reason = getattr(candidate.finish_reason, 'name', candidate.finish_reason)
+        if reason in ('STOP', 'MAX_TOKENS'):
+            parts = candidate.content.parts if candidate.content else ()
+            full_text = "".join([getattr(part, 'text', '') for part in parts])
+            if not full_text:
+                logger.error(f"No valid text content found in Gemini response. Response: {response}")
+                raise LLMInterfaceError("No valid text content received from Gemini.")
+            if reason == 'MAX_TOKENS':
+                logger.warning("Gemini response truncated due to MAX_TOKENS.") # Still return the truncated text
+            logger.debug("Gemini response received successfully. Length: %d", len(full_text))
+            return full_text, reason == 'MAX_TOKENS'
+        if reason in ('SAFETY', 'RECITATION'):
+            logger.error(f"Gemini response blocked due to: {reason}")
+            # Log safety ratings if available
+            for rating in candidate.safety_ratings or ():
+                logger.error(f"Safety Rating: Category={rating.category}, Probability={rating.probability}")
+            raise LLMInterfaceError(f"Gemini prompt blocked due to {reason}.")
+        # Other finish reasons like 'OTHER' or 'UNSPECIFIED'
+        logger.error(f"Gemini generation stopped due to an unexpected reason: {reason}")
+        raise LLMInterfaceError(f"Gemini generation failed with reason: {reason}")
+
+    except LLMInterfaceError:
+        raise
     except google_exceptions.GoogleAPIError as e:
         logger.error(f"Gemini API error: {e}", exc_info=True)
         raise LLMInterfaceError(f"Gemini API error: {e}")
@@ -119,50 +432,323 @@ async def _send_prompt_async(prompt_text: str, generation_config_override: Gener
         raise LLMInterfaceError(f"Unexpected error interacting with Gemini: {e}")
 
 
+async def _stream_prompt_async(prompt_text: str, generation_config_override: GenerationConfig = None,
+                               model_tier: str = "standard"):
+    """
+    Like _send_prompt_async, but yields the response text in chunks as Gemini generates it, so a UI
+    can show the start of the answer after the time to first token rather than the full completion
+    time. A response found in the exact cache is yielded as one chunk; the semantic cache is skipped,
+    since embedding the prompt first would delay the first token. The complete text is cached as usual,
+    unless it was cut short by MAX_TOKENS.
+    (This is an async generator)
+
+    Raises:
+        LLMInterfaceError: As for _send_prompt_async; possibly after some chunks were already yielded.
+    """
+    if not _model:
+        logger.error("Gemini model not configured. Call configure_genai_client() first.")
+        raise LLMInterfaceError("Gemini model is not configured.")
+    model = _models.get(model_tier)
+    if model is None:
+        raise LLMInterfaceError(f"Unknown model tier: {model_tier}")
+
+    cache_key = None
+    if response_cache is not None and _is_cacheable(generation_config_override):
+        cache_key = LLMCache.cache_key(model.model_name, prompt_text)
+        cached_text = await response_cache.get(cache_key)
+        if cached_text is not None:
+            logger.debug("Gemini response served from cache. Length: %d", len(cached_text))
+            yield cached_text
+            return
+
+    logger.debug("Streaming prompt to Gemini (%s): '%.100s...'", model.model_name, prompt_text)
+    chunks = []
+    truncated = False
+    try:
+        response = await _generate_with_retries(model, prompt_text, generation_config_override, stream=True)
+        async for chunk in response:
+            text, chunk_truncated = _chunk_text(chunk)
+            truncated = truncated or chunk_truncated
+            if text:
+                chunks.append(text)
+                yield text
+    except LLMInterfaceError:
+        raise
+    except google_exceptions.GoogleAPIError as e:
+        logger.error(f"Gemini API error while streaming: {e}", exc_info=True)
+        raise LLMInterfaceError(f"Gemini API error: {e}")
+    except Exception as e:
+        logger.error(f"An unexpected error occurred while streaming from Gemini: {e}", exc_info=True)
+        raise LLMInterfaceError(f"Unexpected error interacting with Gemini: {e}")
+
+    if not chunks:
+        logger.error("No text content found in streamed Gemini response.")
+        raise LLMInterfaceError("No valid text content received from Gemini.")
+    full_text = "".join(chunks)
+    logger.debug("Gemini stream completed. Length: %d", len(full_text))
+    if cache_key is not None and not truncated:
+        await response_cache.set(cache_key, full_text)
+
+
+def _chunk_text(chunk) -> tuple[str, bool]:
+    """(text, truncated by MAX_TOKENS) of one streamed response chunk; raises LLMInterfaceError if generation was blocked."""
+    candidate = chunk.candidates[0] if chunk.candidates else None
+    if candidate is None:
+        block_reason = getattr(getattr(chunk, 'prompt_feedback', None), 'block_reason', None)
+        logger.error(f"No candidates in streamed Gemini response. Prompt block reason: {block_reason}")
+        raise LLMInterfaceError("No valid text content received from Gemini.")
+    reason = getattr(candidate.finish_reason, 'name', candidate.finish_reason)
+    if reason in ('SAFETY', 'RECITATION'):
+        logger.error(f"Gemini response blocked due to: {reason}")
+        raise LLMInterfaceError(f"Gemini prompt blocked due to {reason}.")
+    if reason == 'MAX_TOKENS':
+        logger.warning("Gemini response truncated due to MAX_TOKENS.")
+    parts = candidate.content.parts if candidate.content else ()
+    return "".join([getattr(part, 'text', '') for part in parts]), reason == 'MAX_TOKENS'
+
+
+# --- Prompt Templates ---
+# Gemini reuses cached work for a prompt whose beginning is byte-identical to an earlier request's, which
+# cuts time to first token. So each prompt starts with its fixed instructions and output format, and the
+# per-request content follows, ordered from least to most variable (the CV analysis is the same for all
+# of a user's jobs; the job description changes every time).
+_CV_ANALYSIS_KEYS = """"contact_info": { "name": "...", "email": "...", "phone": "..." },
+"summary": "...",
+"skills": ["skill1", "skill2", ...],
+"experience": [
+    { "title": "...", "company": "...", "duration": "...", "responsibilities": ["...", "..."] },
+    ...
+],
+"education": [
+    { "degree": "...", "institution": "...", "year": "..." },
+    ...
+]
+If some information is not available, use null or an empty list/string as appropriate."""
+_ANALYZE_CV_PREFIX = """Analyze the following CV text and extract key information.
+Return the information as a JSON object with the following keys:
+""" + _CV_ANALYSIS_KEYS
+
+_QUESTIONS_INSTRUCTIONS = """generate up to 11 targeted questions for the user
+to clarify their job preferences. The questions should help understand their desired roles,
+key skills they want to use, preferred work environment, salary expectations (ask sensitively, e.g., "What are your salary expectations, if you're comfortable sharing?"),
+location preferences (including remote work), and any other factors important for a job search.
+Return the questions as a JSON list of strings.
+
+Example format: ["What are your top 3 desired job titles?", "Are you looking for remote, hybrid, or on-site roles?"]"""
+_QUESTIONS_PREFIX = "Based on the CV analysis below, " + _QUESTIONS_INSTRUCTIONS
+_QUESTIONS_FROM_TEXT_PREFIX = "Based on the CV below, " + _QUESTIONS_INSTRUCTIONS
+
+_ONBOARDING_PREFIX = """Analyze the following CV text and return a JSON object with two keys, "analysis" and "questions".
+
+"analysis": The key information from the CV, as a JSON object with the following keys:
+""" + _CV_ANALYSIS_KEYS + """
+
+"questions": Based on the CV, """ + _QUESTIONS_INSTRUCTIONS
+
+_SNIPPET_PREFIX = """Given the user's CV analysis, their preferences, and the job description below,
+generate a concise and compelling snippet (2-3 sentences) that can be used in a cover letter
+or as an answer to a common application question (e.g., "Why are you interested in this role?").
+The snippet should highlight the most relevant skills and experiences from the CV
+that match the job description and align with user preferences."""
+
+_FIT_PREFIX = """Analyze the user's CV, their job preferences, and the provided job description.
+Assess the fit for the job.
+Return your assessment as a JSON object with two keys:
+1. "fit_score": A float between 0.0 (no fit) and 1.0 (perfect fit).
+2. "justification": A brief explanation (1-2 sentences) for the score, highlighting key matching factors or discrepancies."""
+
+_FIT_MULTI_PREFIX = """Analyze the user's CV, their job preferences, and each of the numbered job descriptions below.
+Assess the fit for each job independently.
+Return a JSON array with one object per job, in the same order as the jobs, each with two keys:
+1. "fit_score": A float between 0.0 (no fit) and 1.0 (perfect fit).
+2. "justification": A brief explanation (1-2 sentences) for the score, highlighting key matching factors or discrepancies."""
+
+# JSON mode: Gemini returns bare JSON (no markdown fences), matching the schema where one is given.
+class _FitAssessment(TypedDict):
+    fit_score: float
+    justification: str
+
+_JSON_OUTPUT_CONFIG = GenerationConfig(response_mime_type="application/json")
+_QUESTIONS_OUTPUT_CONFIG = GenerationConfig(response_mime_type="application/json", response_schema=list[str])
+_FIT_OUTPUT_CONFIG = GenerationConfig(response_mime_type="application/json", response_schema=_FitAssessment)
+_FIT_MULTI_OUTPUT_CONFIG = GenerationConfig(response_mime_type="application/json", response_schema=list[_FitAssessment])
+
+# Section headers between the variable parts; prompts are assembled with a single "".join.
+_CV_TEXT_SECTION = "\n\nCV Text:\n---\n"
+_CV_ANALYSIS_SECTION = "\n\nCV Analysis:\n---\n"
+_CV_SUMMARY_SECTION = "\n\nCV Summary:\n---\n"
+_PREFERENCES_SECTION = "\n---\n\nUser Preferences:\n---\n"
+_JOB_SECTION = "\n---\n\nJob Description:\n---\n"
+_ANALYZE_CV_SUFFIX = "\n---\n\nJSON Output:\n"
+_QUESTIONS_SUFFIX = "\n---\n\nJSON List of Questions:\n"
+_ONBOARDING_SUFFIX = '\n---\n\nJSON Output (with "analysis" and "questions"):\n'
+_SNIPPET_SUFFIX = "\n---\n\nCover Letter Snippet:\n"
+_FIT_SUFFIX = '\n---\n\nJSON Output (with "fit_score" and "justification"):\n'
+_JOBS_SECTION = "\n---\n\nJob Descriptions:"
+_FIT_MULTI_SUFFIX = '\n---\n\nJSON Array (one object with "fit_score" and "justification" per job, in order):\n'
+
+
+@dataclasses.dataclass(frozen=True)
+class UserContext:
+    """
+    A user's CV analysis and preferences, serialized once for use in prompts.
+    Build it with UserContext.from_dicts() when a session starts and pass it as `cv_analysis` to
+    generate_clarification_questions / generate_cover_letter_snippet / check_job_fit (the dicts are
+    then not re-serialized for every prompt). Compact JSON with sorted keys is shorter than the dicts'
+    repr (fewer tokens) and identical for equal dicts, so repeated prompts hit the response caches.
+    """
+    cv_analysis_json: str
+    user_preferences_json: str = "{}"
+    # Compact CV summary (see build_cv_fingerprint()) used instead of the full analysis in the per-job prompts;
+    # those run once per job, so the CV would otherwise dominate their input tokens. Empty: use the analysis.
+    cv_fingerprint: str = ""
+
+    @classmethod
+    def from_dicts(cls, cv_analysis: dict, user_preferences: Optional[dict] = None) -> "UserContext":
+        """
+        Raises:
+            TypeError: If either dict contains a value that isn't JSON serializable.
+        """
+        return cls(
+            cv_analysis_json=json_dumps(cv_analysis, sort_keys=True).decode('utf-8'),
+            user_preferences_json=json_dumps(user_preferences or {}, sort_keys=True).decode('utf-8'),
+            cv_fingerprint=build_cv_fingerprint(cv_analysis)
+        )
+
+
+# Limits for build_cv_fingerprint(); together they keep it to a few hundred tokens
+_FINGERPRINT_MAX_SUMMARY_CHARS = 300
+_FINGERPRINT_MAX_SKILLS = 40
+_FINGERPRINT_MAX_ROLES = 3
+_FINGERPRINT_MAX_EDUCATION = 2
+
+def build_cv_fingerprint(cv_analysis: dict) -> str:
+    """
+    Builds a compact plain-text summary of a CV analysis (as returned by analyze_cv_text): the first
+    sentence of the summary, the skills, the most recent roles and education. Contact details and
+    responsibilities are left out. Rule-based, so it costs no extra request; missing or malformed
+    fields are skipped. Returns "" if nothing usable is found.
+    """
+    def _text(value) -> str:
+        return value.strip() if isinstance(value, str) else ""
+
+    def _list(key: str) -> list:
+        value = cv_analysis.get(key)
+        return value if isinstance(value, list) else []
+
+    if not isinstance(cv_analysis, dict):
+        return ""
+    lines = []
+    summary = _text(cv_analysis.get("summary"))
+    if summary:
+        first_sentence = summary.split(". ", 1)[0].rstrip(".")
+        lines.append(f"Summary: {first_sentence[:_FINGERPRINT_MAX_SUMMARY_CHARS]}.")
+    skills = [_text(skill) for skill in _list("skills")[:_FINGERPRINT_MAX_SKILLS]]
+    if any(skills):
+        lines.append("Skills: " + ", ".join([skill for skill in skills if skill]))
+    roles = []
+    for job in _list("experience")[:_FINGERPRINT_MAX_ROLES]:
+        if isinstance(job, dict) and _text(job.get("title")):
+            role = _text(job.get("title"))
+            if _text(job.get("company")):
+                role += f" at {_text(job.get('company'))}"
+            if _text(job.get("duration")):
+                role += f" ({_text(job.get('duration'))})"
+            roles.append(role)
+    if roles:
+        lines.append("Recent roles: " + "; ".join(roles))
+    degrees = []
+    for entry in _list("education")[:_FINGERPRINT_MAX_EDUCATION]:
+        if isinstance(entry, dict) and _text(entry.get("degree")):
+            degree = _text(entry.get("degree"))
+            if _text(entry.get("institution")):
+                degree += f", {_text(entry.get('institution'))}"
+            degrees.append(degree)
+    if degrees:
+        lines.append("Education: " + "; ".join(degrees))
+    return "\n".join(lines)
+
+
+def _user_context(cv_analysis: Union[dict, UserContext], user_preferences: Optional[dict] = None) -> UserContext:
+    """Returns cv_analysis if it is already a UserContext, otherwise serializes the dicts into one."""
+    if isinstance(cv_analysis, UserContext):
+        return cv_analysis
+    try:
+        return UserContext.from_dicts(cv_analysis, user_preferences)
+    except TypeError as e:
+        raise LLMInterfaceError(f"CV analysis or preferences could not be serialized for the prompt: {e}")
+
+
+def _cv_prompt_section(context: UserContext) -> tuple[str, str]:
+    """(section header, text) for the CV in per-job prompts: the fingerprint if there is one, else the full analysis."""
+    if context.cv_fingerprint:
+        return _CV_SUMMARY_SECTION, context.cv_fingerprint
+    return _CV_ANALYSIS_SECTION, context.cv_analysis_json
+
+
+def _semantic_namespace(kind: str, context: UserContext) -> str:
+    """
+    Semantic cache namespace for a per-job prompt of the given kind about this user's CV and preferences.
+    The prompt embedding is dominated by the job description, so without the user in the namespace a
+    similar CV applying to the same job would be served another user's fit justification or snippet.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(context.cv_analysis_json.encode('utf-8'))
+    digest.update(b"\0")
+    digest.update(context.user_preferences_json.encode('utf-8'))
+    return f"{kind}:{digest.hexdigest()}"
+
+
+def _job_prompt(prefix: str, context: UserContext, job_description: str, suffix: str) -> str:
+    """Assembles a prompt about one job from the user's context."""
+    cv_section, cv_text = _cv_prompt_section(context)
+    return "".join((
+        prefix, cv_section, cv_text, _PREFERENCES_SECTION, context.user_preferences_json,
+        _JOB_SECTION, job_description, suffix
+    ))
+
+
+# Responses are cached by exact prompt, so CV text is normalized before it goes into one: the same CV
+# extracted with different layout whitespace (e.g. re-exported, or PDF vs. DOCX) then builds the same prompt
+# and a re-upload is served from the cache. Fewer whitespace tokens are sent, too.
+_HORIZONTAL_SPACE_RE = re.compile(r"[^\S\n]+")
+_LINE_BREAK_RE = re.compile(r" ?\n ?")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+def _normalize_cv_text(cv_text: str) -> str:
+    """Collapses runs of spaces/tabs to one space and runs of blank lines to one blank line; strips each line and the ends."""
+    text = _LINE_BREAK_RE.sub("\n", _HORIZONTAL_SPACE_RE.sub(" ", cv_text))
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
 # --- Core LLM Interaction Functions (Async stubs) ---
+# Each function passes _send_prompt_async a parse function that turns the response into its result and raises
+# LLMInterfaceError for a response it can't use, so such a response is never cached.
+
+def _json_response(response_text: str, what: str) -> Any:
+    """Parses a JSON response; raises LLMInterfaceError naming `what` (e.g. "CV analysis") if it isn't valid JSON."""
+    try:
+        return json_loads(response_text) # orjson when installed; its decode error is a json.JSONDecodeError
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse JSON response from LLM for {what}: {e}. Response text: {response_text[:500]}")
+        raise LLMInterfaceError(f"LLM response for {what} was not valid JSON: {e}")
+
 
 async def analyze_cv_text(cv_text: str) -> dict:
     """
     Analyzes raw CV text to extract structured information like skills, experience, etc.
     (This is an async function)
     """
-    if not _model: configure_genai_client() # Ensure client is configured
-
-    prompt = f"""
-    Analyze the following CV text and extract key information.
-    Return the information as a JSON object with the following keys:
-    "contact_info": {{ "name": "...", "email": "...", "phone": "..." }},
-    "summary": "...",
-    "skills": ["skill1", "skill2", ...],
-    "experience": [
-        {{ "title": "...", "company": "...", "duration": "...", "responsibilities": ["...", "..."] }},
-        ...
-    ],
-    "education": [
-        {{ "degree": "...", "institution": "...", "year": "..." }},
-        ...
-    ]
-    If some information is not available, use null or an empty list/string as appropriate.
-
-    CV Text:
-    ---
-    {cv_text}
-    ---
-
-    JSON Output:
-    """
+    _ensure_configured()
+
+    prompt = "".join((_ANALYZE_CV_PREFIX, _CV_TEXT_SECTION, _normalize_cv_text(cv_text), _ANALYZE_CV_SUFFIX))
     logger.info(f"Analyzing CV text (first 100 chars): {cv_text[:100]}...")
     try:
-        response_text = await _send_prompt_async(prompt)
-        # Basic parsing attempt, can be made more robust
-        import json
-        analysis = json.loads(response_text)
+        # JSON mode without a schema: the prompt describes the fields, and most of them may be null
+        analysis = await _send_prompt_async(prompt, _JSON_OUTPUT_CONFIG, model_tier=_ANALYZE_CV_TIER, parse=_parse_cv_analysis)
         logger.info("CV analysis successful.")
-        logger.debug(f"CV Analysis result: {analysis}")
+        logger.debug("CV Analysis result: %s", analysis)
         return analysis
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse JSON response from LLM for CV analysis: {e}. Response text: {response_text[:500]}", exc_info=True)
-        raise LLMInterfaceError(f"LLM response for CV analysis was not valid JSON: {e}")
     except LLMInterfaceError: # Re-raise specific LLM errors
         raise
     except Exception as e: # Catch-all for other unexpected errors during this function's execution
@@ -170,85 +756,111 @@ async def analyze_cv_text(cv_text: str) -> dict:
         raise LLMInterfaceError(f"Unexpected error during CV analysis: {e}")
 
 
-async def generate_clarification_questions(cv_analysis: dict) -> list[str]:
+def _parse_cv_analysis(response_text: str) -> dict:
+    return _json_response(response_text, "CV analysis")
+
+
+async def generate_clarification_questions(cv_analysis: Union[dict, UserContext]) -> list[str]:
     """
     Generates targeted questions based on CV analysis to clarify job preferences.
+    cv_analysis may be the analysis dict or a UserContext built from it.
     (This is an async function)
     """
-    if not _model: configure_genai_client()
+    _ensure_configured()
 
-    prompt = f"""
-    Based on the following CV analysis, generate up to 11 targeted questions for the user
-    to clarify their job preferences. The questions should help understand their desired roles,
-    key skills they want to use, preferred work environment, salary expectations (ask sensitively, e.g., "What are your salary expectations, if you're comfortable sharing?"),
-    location preferences (including remote work), and any other factors important for a job search.
-    Return the questions as a JSON list of strings.
-
-    CV Analysis:
-    ---
-    {cv_analysis}
-    ---
+    context = _user_context(cv_analysis)
+    logger.info("Generating clarification questions based on CV analysis...")
+    return await _generate_questions("".join((_QUESTIONS_PREFIX, _CV_ANALYSIS_SECTION, context.cv_analysis_json, _QUESTIONS_SUFFIX)))
 
-    Example format: ["What are your top 3 desired job titles?", "Are you looking for remote, hybrid, or on-site roles?"]
 
-    JSON List of Questions:
+async def generate_clarification_questions_from_text(cv_text: str) -> list[str]:
     """
-    logger.info("Generating clarification questions based on CV analysis...")
+    Generates clarification questions like generate_clarification_questions, but from the raw CV text.
+    Needs no CV analysis, so it can run concurrently with analyze_cv_text:
+    `analysis, questions = await asyncio.gather(analyze_cv_text(cv_text), generate_clarification_questions_from_text(cv_text))`
+    (This is an async function)
+    """
+    _ensure_configured()
+
+    logger.info("Generating clarification questions based on CV text...")
+    return await _generate_questions("".join((_QUESTIONS_FROM_TEXT_PREFIX, _CV_TEXT_SECTION, _normalize_cv_text(cv_text), _QUESTIONS_SUFFIX)))
+
+
+def _is_string_list(value) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def _parse_questions(response_text: str) -> list[str]:
+    questions = _json_response(response_text, "clarification questions")
+    # The schema asks for a list of strings, but the response isn't guaranteed to follow it
+    if not _is_string_list(questions):
+        logger.error(f"LLM response for clarification questions is not a list of strings. Response: {response_text[:500]}")
+        raise LLMInterfaceError("LLM response for clarification questions was not a list of strings.")
+    return questions
+
+
+async def _generate_questions(prompt: str) -> list[str]:
+    """Sends a clarification questions prompt and parses the JSON list of questions in the response."""
     try:
-        response_text = await _send_prompt_async(prompt)
-        import json
-        questions = json.loads(response_text)
-        if not isinstance(questions, list) or not all(isinstance(q, str) for q in questions):
-            logger.error(f"LLM response for clarification questions is not a list of strings. Response: {questions}")
-            raise LLMInterfaceError("LLM response for clarification questions was not a list of strings.")
+        questions = await _send_prompt_async(prompt, _QUESTIONS_OUTPUT_CONFIG, model_tier=_QUESTIONS_TIER, parse=_parse_questions)
         logger.info(f"Successfully generated {len(questions)} clarification questions.")
-        logger.debug(f"Generated questions: {questions}")
+        logger.debug("Generated questions: %s", questions)
         return questions
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse JSON response from LLM for questions: {e}. Response text: {response_text[:500]}", exc_info=True)
-        raise LLMInterfaceError(f"LLM response for clarification questions was not valid JSON: {e}")
     except LLMInterfaceError:
         raise
     except Exception as e:
         logger.error(f"Unexpected error in generate_clarification_questions: {e}", exc_info=True)
         raise LLMInterfaceError(f"Unexpected error during question generation: {e}")
 
-async def generate_cover_letter_snippet(cv_analysis: dict, job_description: str, user_preferences: dict) -> str:
+async def analyze_cv_and_generate_questions(cv_text: str) -> tuple[dict, list[str]]:
     """
-    Generates a concise, relevant snippet for a cover letter or application question.
+    Does the work of analyze_cv_text and generate_clarification_questions_from_text in a single request:
+    one round trip, and the CV text is sent (and counted as input tokens) once instead of twice.
+    Returns (cv_analysis, questions).
     (This is an async function)
     """
-    if not _model: configure_genai_client()
+    _ensure_configured()
 
-    prompt = f"""
-    Given the user's CV analysis, their preferences, and the job description below,
-    generate a concise and compelling snippet (2-3 sentences) that can be used in a cover letter
-    or as an answer to a common application question (e.g., "Why are you interested in this role?").
-    The snippet should highlight the most relevant skills and experiences from the CV
-    that match the job description and align with user preferences.
-
-    CV Analysis:
-    ---
-    {cv_analysis}
-    ---
+    prompt = "".join((_ONBOARDING_PREFIX, _CV_TEXT_SECTION, _normalize_cv_text(cv_text), _ONBOARDING_SUFFIX))
+    logger.info("Analyzing CV text and generating clarification questions in one request...")
+    try:
+        analysis, questions = await _send_prompt_async(prompt, _JSON_OUTPUT_CONFIG, model_tier=_ANALYZE_CV_TIER, parse=_parse_onboarding)
+        logger.info(f"CV analysis successful; generated {len(questions)} clarification questions.")
+        logger.debug("CV Analysis result: %s; questions: %s", analysis, questions)
+        return analysis, questions
+    except LLMInterfaceError:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error in analyze_cv_and_generate_questions: {e}", exc_info=True)
+        raise LLMInterfaceError(f"Unexpected error during CV analysis and question generation: {e}")
 
-    User Preferences:
-    ---
-    {user_preferences}
-    ---
 
-    Job Description:
-    ---
-    {job_description}
-    ---
+def _parse_onboarding(response_text: str) -> tuple[dict, list[str]]:
+    result = _json_response(response_text, "CV analysis and questions")
+    analysis = result.get("analysis") if isinstance(result, dict) else None
+    questions = result.get("questions") if isinstance(result, dict) else None
+    if not isinstance(analysis, dict) or not isinstance(questions, list):
+        logger.error(f"LLM response for CV analysis and questions is missing 'analysis' or 'questions': {response_text[:500]}")
+        raise LLMInterfaceError("LLM response for CV analysis and questions did not have the expected structure.")
+    return analysis, [question for question in questions if isinstance(question, str) and question.strip()]
 
-    Cover Letter Snippet:
+async def generate_cover_letter_snippet(cv_analysis: Union[dict, UserContext], job_description: str,
+                                        user_preferences: Optional[dict] = None) -> str:
+    """
+    Generates a concise, relevant snippet for a cover letter or application question.
+    cv_analysis may be the analysis dict or a UserContext; with a UserContext, user_preferences is ignored.
+    (This is an async function)
     """
+    _ensure_configured()
+
+    context = _user_context(cv_analysis, user_preferences)
+    prompt = _job_prompt(_SNIPPET_PREFIX, context, job_description, _SNIPPET_SUFFIX)
     logger.info("Generating cover letter snippet...")
     try:
-        snippet = await _send_prompt_async(prompt)
+        snippet = await _send_prompt_async(prompt, cache_mode="semantic", cache_namespace=_semantic_namespace("cover_letter_snippet", context),
+                                           model_tier=_SNIPPET_TIER)
         logger.info("Cover letter snippet generated successfully.")
-        logger.debug(f"Generated snippet: {snippet}")
+        logger.debug("Generated snippet: %s", snippet)
         return snippet
     except LLMInterfaceError:
         raise
@@ -257,74 +869,218 @@ async def generate_cover_letter_snippet(cv_analysis: dict, job_description: str,
         raise LLMInterfaceError(f"Unexpected error during cover letter snippet generation: {e}")
 
 
-async def check_job_fit(cv_analysis: dict, job_description: str, user_preferences: dict) -> tuple[float, str]:
+async def stream_cover_letter_snippet(cv_analysis: Union[dict, UserContext], job_description: str,
+                                      user_preferences: Optional[dict] = None):
     """
-    Assesses the fit between the user's profile and a job, returning a score and justification.
-    (This is an async function)
+    Streaming variant of generate_cover_letter_snippet for interactive use: yields the snippet text
+    in chunks as it is generated (`async for chunk in stream_cover_letter_snippet(...)`).
+    (This is an async generator)
     """
-    if not _model: configure_genai_client()
+    _ensure_configured()
 
-    prompt = f"""
-    Analyze the user's CV, their job preferences, and the provided job description.
-    Assess the fit for the job.
-    Return your assessment as a JSON object with two keys:
-    1. "fit_score": A float between 0.0 (no fit) and 1.0 (perfect fit).
-    2. "justification": A brief explanation (1-2 sentences) for the score, highlighting key matching factors or discrepancies.
+    context = _user_context(cv_analysis, user_preferences)
+    prompt = _job_prompt(_SNIPPET_PREFIX, context, job_description, _SNIPPET_SUFFIX)
+    logger.info("Streaming cover letter snippet...")
+    async for chunk in _stream_prompt_async(prompt, model_tier=_SNIPPET_TIER):
+        yield chunk
+    logger.info("Cover letter snippet streamed successfully.")
 
-    CV Analysis:
-    ---
-    {cv_analysis}
-    ---
 
-    User Preferences:
-    ---
-    {user_preferences}
-    ---
-
-    Job Description:
-    ---
-    {job_description}
-    ---
-
-    JSON Output (with "fit_score" and "justification"):
+async def check_job_fit(cv_analysis: Union[dict, UserContext], job_description: str,
+                        user_preferences: Optional[dict] = None) -> tuple[float, str]:
     """
-    logger.info("Checking job fit...")
-    try:
-        response_text = await _send_prompt_async(prompt)
-        import json
-        assessment = json.loads(response_text)
+    Assesses the fit between the user's profile and a job, returning a score and justification.
+    cv_analysis may be the analysis dict or a UserContext; with a UserContext, user_preferences is ignored.
+    (This is an async function)
+    """
+    _ensure_configured()
 
-        score = assessment.get("fit_score")
-        justification = assessment.get("justification")
+    context = _user_context(cv_analysis, user_preferences)
+    return await _assess_job_fit(_job_prompt(_FIT_PREFIX, context, job_description, _FIT_SUFFIX), context)
 
-        if not isinstance(score, float) or not (0.0 <= score <= 1.0):
-            logger.error(f"Invalid fit_score from LLM: {score}. Must be float between 0.0 and 1.0.")
-            raise LLMInterfaceError("LLM returned an invalid fit_score.")
-        if not isinstance(justification, str) or not justification.strip():
-            logger.error(f"Missing or empty justification from LLM: {justification}")
-            raise LLMInterfaceError("LLM returned an invalid or empty justification.")
 
+async def _assess_job_fit(prompt: str, context: UserContext) -> tuple[float, str]:
+    """Sends a job fit prompt about context's user and validates the (fit_score, justification) in the response."""
+    logger.info("Checking job fit...")
+    try:
+        score, justification = await _send_prompt_async(prompt, _FIT_OUTPUT_CONFIG, cache_mode="semantic",
+                                                        cache_namespace=_semantic_namespace("check_job_fit", context),
+                                                        model_tier=_FIT_TIER, parse=_parse_fit_assessment)
         logger.info(f"Job fit assessment successful: Score={score}, Justification='{justification}'")
         return score, justification
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse JSON response from LLM for job fit: {e}. Response text: {response_text[:500]}", exc_info=True)
-        raise LLMInterfaceError(f"LLM response for job fit assessment was not valid JSON: {e}")
     except LLMInterfaceError:
         raise
     except Exception as e:
         logger.error(f"Unexpected error in check_job_fit: {e}", exc_info=True)
         raise LLMInterfaceError(f"Unexpected error during job fit assessment: {e}")
 
+
+def _parse_fit_assessment(response_text: str) -> tuple[float, str]:
+    return _validate_fit_assessment(_json_response(response_text, "job fit assessment"))
+
+
+def _validate_fit_assessment(assessment: _FitAssessment) -> tuple[float, str]:
+    """Returns (fit_score, justification) from a parsed assessment; raises LLMInterfaceError if either is invalid."""
+    # The schema describes the shape, but the response isn't guaranteed to follow it, so the types are checked too
+    if not isinstance(assessment, dict):
+        logger.error(f"LLM job fit assessment is not a JSON object: {assessment}")
+        raise LLMInterfaceError("LLM response for job fit assessment was not a JSON object.")
+    score = assessment.get("fit_score")
+    justification = assessment.get("justification")
+
+    # A whole-number score ("fit_score": 1) is still a valid score; bools are not
+    if isinstance(score, int) and not isinstance(score, bool):
+        score = float(score)
+    if not isinstance(score, float) or not (0.0 <= score <= 1.0):
+        logger.error(f"Invalid fit_score from LLM: {score}. Must be float between 0.0 and 1.0.")
+        raise LLMInterfaceError("LLM returned an invalid fit_score.")
+    if not isinstance(justification, str) or not justification.strip():
+        logger.error(f"Missing or empty justification from LLM: {justification}")
+        raise LLMInterfaceError("LLM returned an invalid or empty justification.")
+    return score, justification
+
+
+# In-flight Gemini requests per batch. Keep it under the API's rate limit: at ~1s per call,
+# 16 in flight is ~960 requests per minute. Override with LLM_MAX_CONCURRENCY in config.py.
+_DEFAULT_MAX_CONCURRENCY = 16
+
+async def check_job_fit_batch(cv_analysis: Union[dict, UserContext], jobs: list[str], user_preferences: Optional[dict] = None,
+                              max_concurrency: int = None) -> list[Union[tuple[float, str], Exception]]:
+    """
+    Runs check_job_fit for several job descriptions concurrently, with at most max_concurrency
+    requests in flight. Replaces a `for job in jobs: await check_job_fit(...)` loop: the calls are
+    network-bound, so the batch takes about as long as its slowest few calls rather than their sum.
+    (This is an async function)
+
+    Args:
+        cv_analysis (dict or UserContext): The user's CV analysis, or a UserContext (then user_preferences is ignored).
+        jobs (list[str]): Job descriptions to assess.
+        user_preferences (dict, optional): The user's job preferences.
+        max_concurrency (int, optional): Limit on concurrent requests. Defaults to LLM_MAX_CONCURRENCY
+            from config.py, or 16.
+
+    Returns:
+        list: One result per job, in the same order: a (fit_score, justification) tuple, or the exception
+              (usually LLMInterfaceError) raised for that job. One failed job doesn't affect the others.
+    """
+    _ensure_configured()
+    if max_concurrency is None:
+        max_concurrency = getattr(config, 'LLM_MAX_CONCURRENCY', _DEFAULT_MAX_CONCURRENCY)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    context = _user_context(cv_analysis, user_preferences) # Serialized once for all the jobs
+
+    async def _check_one(job_description: str) -> tuple[float, str]:
+        async with semaphore:
+            return await _assess_job_fit(_job_prompt(_FIT_PREFIX, context, job_description, _FIT_SUFFIX), context)
+
+    logger.info(f"Checking job fit for {len(jobs)} jobs (up to {max_concurrency} at a time)...")
+    results = await asyncio.gather(*(_check_one(job) for job in jobs), return_exceptions=True)
+    n_failed = sum(1 for result in results if isinstance(result, Exception))
+    if n_failed:
+        logger.warning(f"Job fit assessment failed for {n_failed} of {len(jobs)} jobs.")
+    return results
+
+
+def _parse_fit_assessments(response_text: str, n_jobs: int) -> list[Union[tuple[float, str], Exception]]:
+    """
+    Parses a multi-job fit response into one (fit_score, justification) or LLMInterfaceError per job.
+    Raises LLMInterfaceError if the response as a whole can't be used.
+    """
+    assessments = _json_response(response_text, "job fit assessment")
+    if not isinstance(assessments, list): # Valid JSON, but e.g. an object or null instead of the array
+        logger.error(f"LLM response for multi-job fit is not a JSON array: {response_text[:500]}")
+        raise LLMInterfaceError("LLM response for job fit assessment was not a list of assessments.")
+    if len(assessments) != n_jobs: # Results can't be matched to jobs reliably, so none are used
+        logger.error(f"LLM returned {len(assessments)} job fit assessments for {n_jobs} jobs.")
+        raise LLMInterfaceError("LLM returned the wrong number of job fit assessments.")
+
+    results = []
+    for assessment in assessments:
+        try:
+            results.append(_validate_fit_assessment(assessment))
+        except Exception as e:
+            results.append(e if isinstance(e, LLMInterfaceError) else LLMInterfaceError(f"Invalid job fit assessment: {e}"))
+    return results
+
+
+# Jobs per request in check_job_fit_multi. Larger groups mean fewer requests, but longer responses and
+# more jobs lost to one bad response. Override with LLM_FIT_JOBS_PER_REQUEST in config.py.
+_DEFAULT_FIT_JOBS_PER_REQUEST = 8
+
+async def check_job_fit_multi(cv_analysis: Union[dict, UserContext], jobs: list[str], user_preferences: Optional[dict] = None,
+                              batch_size: int = None, max_concurrency: int = None) -> list[Union[tuple[float, str], Exception]]:
+    """
+    Like check_job_fit_batch, but assesses batch_size jobs per request: the prompt lists several numbered
+    job descriptions and Gemini returns an array of assessments. That needs about batch_size times fewer
+    requests (which is what the per-minute request quota counts), and the CV analysis and preferences
+    are sent once per group instead of once per job. The groups run concurrently.
+    (This is an async function)
+
+    Args:
+        cv_analysis (dict or UserContext): The user's CV analysis, or a UserContext (then user_preferences is ignored).
+        jobs (list[str]): Job descriptions to assess.
+        user_preferences (dict, optional): The user's job preferences.
+        batch_size (int, optional): Jobs per request. Defaults to LLM_FIT_JOBS_PER_REQUEST from config.py, or 8.
+        max_concurrency (int, optional): Limit on concurrent requests, as for check_job_fit_batch.
+
+    Returns:
+        list: One result per job, in the same order: a (fit_score, justification) tuple, or the exception
+              (usually LLMInterfaceError) for that job. A failed request fails every job in its group.
+    """
+    _ensure_configured()
+    if batch_size is None:
+        batch_size = getattr(config, 'LLM_FIT_JOBS_PER_REQUEST', _DEFAULT_FIT_JOBS_PER_REQUEST)
+    if max_concurrency is None:
+        max_concurrency = getattr(config, 'LLM_MAX_CONCURRENCY', _DEFAULT_MAX_CONCURRENCY)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    context = _user_context(cv_analysis, user_preferences)
+    prompt_start = "".join((_FIT_MULTI_PREFIX, *_cv_prompt_section(context),
+                            _PREFERENCES_SECTION, context.user_preferences_json, _JOBS_SECTION))
+
+    async def _check_group(group: list[str]) -> list[Union[tuple[float, str], Exception]]:
+        parts = [prompt_start]
+        for number, job_description in enumerate(group, 1):
+            parts.append(f"\n\nJob {number}:\n---\n")
+            parts.append(job_description)
+        parts.append(_FIT_MULTI_SUFFIX)
+        try:
+            async with semaphore:
+                # A response with some invalid assessments still gives the valid ones, but isn't cached
+                return await _send_prompt_async("".join(parts), _FIT_MULTI_OUTPUT_CONFIG, model_tier=_FIT_TIER,
+                                                parse=lambda response_text: _parse_fit_assessments(response_text, len(group)),
+                                                cacheable=lambda results: not any(isinstance(result, Exception) for result in results))
+        except LLMInterfaceError as e:
+            return [e] * len(group)
+
+    groups = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+    logger.info(f"Checking job fit for {len(jobs)} jobs in {len(groups)} requests...")
+    results = [result for group_results in await asyncio.gather(*(_check_group(group) for group in groups)) for result in group_results]
+    n_failed = sum(1 for result in results if isinstance(result, Exception))
+    if n_failed:
+        logger.warning(f"Job fit assessment failed for {n_failed} of {len(jobs)} jobs.")
+    return results
+
 # Example Usage (for testing purposes, typically called from other modules or main.py)
 if __name__ == '__main__':
-    import asyncio
-
     async def main_test():
         print("--- llm_interface.py standalone test ---")
+        # Offline: semantic cache entries for one CV must never be served for another, even for the same job
+        context_a = UserContext.from_dicts({"skills": ["Python", "AWS"]}, {"location": "Remote"})
+        context_b = UserContext.from_dicts({"skills": ["Python", "GCP"]}, {"location": "Remote"})
+        assert _semantic_namespace("check_job_fit", context_a) == _semantic_namespace("check_job_fit", UserContext.from_dicts({"skills": ["Python", "AWS"]}, {"location": "Remote"}))
+        assert _semantic_namespace("check_job_fit", context_a) != _semantic_namespace("check_job_fit", context_b)
+        local_semantic = create_semantic_cache_from_config()
+        if local_semantic is not None:
+            local_semantic.add(_semantic_namespace("check_job_fit", context_a), [1.0, 0.0, 0.1], "fit for A")
+            assert local_semantic.lookup(_semantic_namespace("check_job_fit", context_a), [1.0, 0.0, 0.1]) == "fit for A"
+            assert local_semantic.lookup(_semantic_namespace("check_job_fit", context_b), [1.0, 0.0, 0.1]) is None
+            print("Semantic cache namespaces are per CV.")
+
         # This test requires GEMINI_API_KEY to be correctly set in job_application_agent/config.py
         # For safety, this test will not run if config.py is not found or key is placeholder.
         try:
             configure_genai_client() # Call this first
+            await warm_up_client()
             if not config.GEMINI_API_KEY or config.GEMINI_API_KEY == "YOUR_GEMINI_API_KEY_HERE":
                  print("GEMINI_API_KEY is not set in config. Skipping live API tests.")
                  return
@@ -386,18 +1142,35 @@ if __name__ == '__main__':
             print(f"CV Analysis Result (snippet): Name: {cv_analysis_result.get('contact_info', {}).get('name')}, Skills: {cv_analysis_result.get('skills', [])[:3]}")
 
             if cv_analysis_result:
+                user_context = UserContext.from_dicts(cv_analysis_result, mock_user_preferences) # Serialized once, reused below
                 print("\n2. Testing Clarification Question Generation...")
-                questions_result = await generate_clarification_questions(cv_analysis_result)
+                questions_result = await generate_clarification_questions(user_context)
                 print(f"Generated Questions (first 3): {questions_result[:3]}")
 
                 print("\n3. Testing Cover Letter Snippet Generation...")
-                snippet_result = await generate_cover_letter_snippet(cv_analysis_result, mock_job_description, mock_user_preferences)
+                snippet_result = await generate_cover_letter_snippet(user_context, mock_job_description)
                 print(f"Generated Snippet: {snippet_result}")
 
+                print("\n3b. Testing Streamed Cover Letter Snippet...")
+                async for chunk in stream_cover_letter_snippet(user_context, mock_job_description + "\nStreamed."):
+                    print(f"Chunk: {chunk!r}")
+
                 print("\n4. Testing Job Fit Assessment...")
-                fit_score, justification = await check_job_fit(cv_analysis_result, mock_job_description, mock_user_preferences)
+                fit_score, justification = await check_job_fit(user_context, mock_job_description)
                 print(f"Job Fit: Score={fit_score}, Justification='{justification}'")
 
+                print("\n4b. Testing Batch Job Fit Assessment...")
+                batch_results = await check_job_fit_batch(user_context, [mock_job_description, "Job Title: Pastry Chef"])
+                print(f"Batch Job Fit: {batch_results}")
+
+                print("\n4c. Testing Multi-Job Fit Assessment (one request)...")
+                multi_results = await check_job_fit_multi(user_context, [mock_job_description, "Job Title: Pastry Chef"])
+                print(f"Multi-Job Fit: {multi_results}")
+
+                print("\n5. Repeating CV Analysis (should be served from the response cache)...")
+                await analyze_cv_text(mock_cv_text)
+                print(f"Response cache: {response_cache.stats}")
+
         except LLMInterfaceError as e:
             print(f"\nAn LLMInterfaceError occurred during testing: {e}")
         except ConfigError as e:
@@ -1,17 +1,16 @@
+import asyncio
 import io
 import os
-import json # For storing user data if needed, and for LLM interactions
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
 from typing import Optional # Added Optional
-<<<<<<< HEAD
-
-=======
->>>>>>> 41be2d46fdc3380ee686036e6e2152a4f5cd3690
-import Optional
-
 
 from telegram import Update, File as TelegramFile # Renamed to avoid conflict
+from telegram.error import InvalidToken
 from telegram.ext import (
+    AIORateLimiter,
     Application,
     ApplicationBuilder,
     CommandHandler,
@@ -21,6 +20,16 @@ from telegram.ext import (
     filters,
 )
 
+try:
+    import h2 # Optional; enables HTTP/2 for the Bot API connection (pip install "httpx[http2]")
+except ImportError:
+    h2 = None
+
+try:
+    import aiolimiter # Optional; needed by AIORateLimiter (pip install "python-telegram-bot[rate-limiter]")
+except ImportError:
+    aiolimiter = None
+
 from job_application_agent import config
 from job_application_agent.core_modules.error_handler import (
     get_logger,
@@ -32,11 +41,14 @@ from job_application_agent.core_modules.error_handler import (
 # LLM Interface functions are async
 from job_application_agent.core_modules.llm_interface import (
     configure_genai_client as configure_llm_client, # Renamed for clarity
-    analyze_cv_text,
-    generate_clarification_questions,
+    warm_up_client as warm_up_llm_client,
+    rewarm_connection_if_idle as rewarm_llm_connection_if_idle,
+    analyze_cv_and_generate_questions,
     # For future use: generate_cover_letter_snippet, check_job_fit
 )
-from job_application_agent.core_modules.cv_parser import parse_cv
+from job_application_agent.core_modules.cv_parser import disable_parallel_page_extraction, parse_cv
+from job_application_agent.core_modules.http_client import close_http_client
+from job_application_agent.core_modules.bot_persistence import SqlitePersistence
 # from job_application_agent.core_modules.job_manager import store_user_preferences # Placeholder
 
 logger = get_logger(__name__)
@@ -44,24 +56,79 @@ logger = get_logger(__name__)
 # --- Conversation States ---
 ASK_CV, HANDLE_CV, ASK_QUESTIONS, HANDLE_ANSWERS = range(4)
 
+_CV_FILE_EXTENSIONS = frozenset({".pdf", ".docx"}) # What parse_cv supports
+# Documents that are routed to handle_cv_upload. The file extension is accepted as well as the MIME type,
+# because some clients send DOCX files as application/octet-stream.
+_CV_DOCUMENT_FILTER = (
+    filters.Document.PDF | filters.Document.DOCX
+    | filters.Document.FileExtension("pdf") | filters.Document.FileExtension("docx")
+)
+
+# Uploaded CVs up to this size are buffered in memory, larger ones in a temporary file
+_CV_SPOOL_MAX_BYTES = 1 << 20
+# Larger uploads are rejected before downloading them; a CV is rarely more than a few hundred KB
+_MAX_CV_BYTES = getattr(config, 'MAX_CV_BYTES', 10 * 1024 * 1024)
+
+# CV parsing is CPU-bound, so it runs in worker processes instead of blocking the event loop (and with it every
+# other user) for the duration of each parse. Separate processes also keep PDFium, which is not thread-safe,
+# out of threads. The semaphore caps how many uploads (and their bytes) are queued for the pool at once.
+# Each worker parses its PDF's pages itself: the pool already spreads uploads over the CPUs.
+_parse_pool = None
+_parse_semaphore = asyncio.Semaphore(2 * (os.cpu_count() or 1))
+
+
+def _get_parse_pool() -> ProcessPoolExecutor:
+    """Lazily creates the worker pool for CV parsing."""
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1, initializer=disable_parallel_page_extraction)
+    return _parse_pool
+
+
+async def _parse_cv_in_pool(cv_bytes: bytes, file_name: str) -> str:
+    """Runs parse_cv in the parsing pool; its exceptions (e.g. CVParserError) are re-raised here."""
+    async with _parse_semaphore:
+        return await asyncio.get_running_loop().run_in_executor(
+            _get_parse_pool(), parse_cv, io.BytesIO(cv_bytes), file_name
+        )
+
 # --- Utility Functions ---
+_llm_configured = False # Set once ensure_llm_client_configured() has succeeded
+
 async def ensure_llm_client_configured():
-    """Ensures the LLM client is configured."""
-    # This is a simplified check. In a real app, configure_llm_client()
-    # should be called once at startup.
+    """
+    Ensures the LLM client is configured and its connection warmed up. Runs once at startup, from
+    start_bot_async() (which only logs a failure); later calls return immediately. Both steps are idempotent, so
+    concurrent first calls are harmless and need no lock.
+    """
+    global _llm_configured
+    if _llm_configured:
+        return
     try:
-        # Accessing a global or a stateful check in llm_interface if it exists,
-        # or just calling it (it should be idempotent).
-        await configure_llm_client()
+        configure_llm_client() # Synchronous
+        await warm_up_llm_client() # Connect to the API now rather than on the first user's request
+        _llm_configured = True
     except ConfigError as e:
         logger.error(f"LLM Client Configuration failed: {e}")
         raise # Re-raise to be handled by the calling function
 
+async def _with_status_message(message, status_text: str, work):
+    """
+    Sends status_text as a reply while awaiting the coroutine work, and returns work's result.
+    Exceptions from work propagate; a failed status message is only logged.
+    """
+    status_result, result = await asyncio.gather(message.reply_text(status_text), work, return_exceptions=True)
+    if isinstance(status_result, Exception):
+        logger.warning(f"Could not send status message: {status_result}")
+    if isinstance(result, BaseException):
+        raise result
+    return result
+
 # --- Command Handlers ---
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Starts the conversation and asks for the CV."""
     user = update.message.from_user
-    logger.info(f"User {user.id} ({user.username}) started conversation with /start.")
+    logger.info("User %s (%s) started conversation with /start.", user.id, user.username)
     await update.message.reply_text(
         "Welcome to the AI Job Application Agent! \n\n"
         "I can help you find and apply for jobs. To begin, please upload your CV "
@@ -80,31 +147,41 @@ async def handle_cv_upload(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         return ASK_CV
 
     doc = message.document
-    file_name = doc.file_name
+    file_name = doc.file_name or "" # Telegram documents don't always carry a file name
 
     # Basic check for file extension (more robust checks in cv_parser)
-    if not (file_name.lower().endswith(".pdf") or file_name.lower().endswith(".docx")):
+    if os.path.splitext(file_name)[1].lower() not in _CV_FILE_EXTENSIONS:
         logger.warning(f"User {user.id} uploaded unsupported file type: {file_name}")
         await message.reply_text(
             "Unsupported file type. Please upload your CV in PDF or DOCX format."
         )
         return ASK_CV
 
-    logger.info(f"User {user.id} uploaded CV: {file_name} (Size: {doc.file_size} bytes)")
-    await message.reply_text(f"Received your CV: {file_name}. Processing it now...")
+    if doc.file_size and doc.file_size > _MAX_CV_BYTES:
+        logger.warning(f"User {user.id} uploaded an oversized CV: {file_name} ({doc.file_size} bytes)")
+        await message.reply_text(
+            f"That file is too large ({doc.file_size / (1024 * 1024):.1f} MB). "
+            f"Please upload a CV of at most {_MAX_CV_BYTES // (1024 * 1024)} MB."
+        )
+        return ASK_CV
+
+    logger.info("User %s uploaded CV: %s (Size: %s bytes)", user.id, file_name, doc.file_size)
+    # Fire and forget: the download starts right away instead of after this message's round trip.
+    # PTB's create_task reports a failure to the application's error handlers.
+    context.application.create_task(message.reply_text(f"Received your CV: {file_name}. Processing it now..."), update=update)
 
     try:
-        await ensure_llm_client_configured() # Ensure LLM client is ready
-
         cv_file: TelegramFile = await doc.get_file()
-        cv_file_stream = io.BytesIO()
-        await cv_file.download_to_memory(cv_file_stream)
-        cv_file_stream.seek(0) # Reset stream position to the beginning
-
-        logger.debug(f"CV for user {user.id} downloaded to memory. Size: {cv_file_stream.getbuffer().nbytes}")
-
-        # 1. Parse CV
-        raw_cv_text = parse_cv(cv_file_stream, file_name)
+        # Small CVs stay in memory while downloading; larger ones spill to a temporary file.
+        with tempfile.SpooledTemporaryFile(max_size=_CV_SPOOL_MAX_BYTES) as cv_file_stream:
+            await cv_file.download_to_memory(cv_file_stream)
+            logger.debug("CV for user %s downloaded. Size: %d", user.id, cv_file_stream.tell())
+            cv_file_stream.seek(0) # Reset stream position to the beginning
+            cv_bytes = cv_file_stream.read() # Only bytes can be sent to the worker process
+
+        # 1. Parse CV. If the LLM connection has been idle, it is re-established meanwhile rather than
+        # by the analysis request below.
+        raw_cv_text, _ = await asyncio.gather(_parse_cv_in_pool(cv_bytes, file_name), rewarm_llm_connection_if_idle())
         if not raw_cv_text:
             logger.warning(f"CV parsing for {file_name} (user {user.id}) resulted in empty text.")
             await message.reply_text(
@@ -113,18 +190,19 @@ async def handle_cv_upload(update: Update, context: ContextTypes.DEFAULT_TYPE) -
             )
             return ASK_CV
 
-        logger.info(f"CV for user {user.id} parsed successfully. Raw text length: {len(raw_cv_text)}")
-        context.user_data['raw_cv_text'] = raw_cv_text # Store for potential later use
+        logger.info("CV for user %s parsed successfully. Raw text length: %d", user.id, len(raw_cv_text))
 
-        # 2. Analyze CV with LLM
-        await message.reply_text("Analyzing your CV with AI to understand your skills and experience...")
-        cv_analysis = await analyze_cv_text(raw_cv_text)
+        # 2. Analyze CV and generate clarification questions with LLM, both in one request.
+        # The status message is sent while the request is already running rather than before it.
+        cv_analysis, questions = await _with_status_message(
+            message,
+            "Analyzing your CV with AI and preparing a few questions to tailor your job search...",
+            analyze_cv_and_generate_questions(raw_cv_text)
+        )
         context.user_data['cv_analysis'] = cv_analysis
-        logger.info(f"CV for user {user.id} analyzed by LLM. Analysis keys: {list(cv_analysis.keys())}")
+        logger.info("CV for user %s analyzed by LLM. Analysis keys: %s", user.id, cv_analysis.keys())
 
-        # 3. Generate Clarification Questions
-        await message.reply_text("Generating a few questions to tailor your job search...")
-        questions = await generate_clarification_questions(cv_analysis)
+        # 3. Check Clarification Questions
         if not questions:
             logger.warning(f"LLM generated no clarification questions for user {user.id}.")
             await message.reply_text(
@@ -135,16 +213,19 @@ async def handle_cv_upload(update: Update, context: ContextTypes.DEFAULT_TYPE) -
             # For now, ending conversation as question handling is the next step.
             # Simulate storing preferences
             # store_user_preferences(user.id, {"cv_analysis": cv_analysis, "preferences_via_questions": {}})
-            logger.info(f"User {user.id} preferences (CV only) stored.")
+            logger.info("User %s preferences (CV only) stored.", user.id)
             return ConversationHandler.END
 
         context.user_data['questions'] = questions
-        context.user_data['answers'] = {}
-        context.user_data['current_question_index'] = 0
+        context.user_data['answers'] = [None] * len(questions) # answers[i] answers questions[i]
 
-        logger.info(f"Generated {len(questions)} questions for user {user.id}.")
-        await message.reply_text("Great! Let's clarify a few things to personalize your job search.")
-        await message.reply_text(questions[0])
+        logger.info("Generated %d questions for user %s.", len(questions), user.id)
+        # All questions in one message, answered in one reply, instead of one round trip per question
+        await message.reply_text(
+            "Great! Let's clarify a few things to personalize your job search.\n\n"
+            + "\n".join([f"{number}. {question}" for number, question in enumerate(questions, 1)])
+            + "\n\nPlease answer in a single message, one numbered answer per line (e.g. \"1. ...\")."
+        )
         return ASK_QUESTIONS
 
     except CVParserError as e:
@@ -155,7 +236,7 @@ async def handle_cv_upload(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         logger.error(f"LLMInterfaceError for user {user.id} while processing CV {file_name}: {e}", exc_info=True)
         await message.reply_text(f"There was an issue with the AI model while processing your CV: {e}. Please try again later.")
         return ConversationHandler.END # End conversation on LLM error for now
-    except ConfigError as e: # Catch if ensure_llm_client_configured fails
+    except ConfigError as e: # e.g. the LLM client couldn't be configured
         logger.critical(f"Configuration error during CV handling: {e}", exc_info=True)
         await message.reply_text("A critical configuration error occurred. The bot admin has been notified. Please try again later.")
         return ConversationHandler.END
@@ -165,58 +246,92 @@ async def handle_cv_upload(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         return ASK_CV
 
 
+async def reject_unsupported_upload(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Replies to anything other than a PDF/DOCX document while waiting for the CV."""
+    message = update.message
+    if message.document:
+        logger.warning(f"User {message.from_user.id} uploaded unsupported file type: {message.document.file_name}")
+        await message.reply_text("Unsupported file type. Please upload your CV in PDF or DOCX format.")
+    else:
+        await message.reply_text("Hmm, that doesn't look like a file. Please upload your CV as a PDF or DOCX document.")
+    return ASK_CV
+
+
 async def handle_question_answer(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Handles user's answer to a question and asks the next one."""
+    """Handles the user's reply with the answers to all clarification questions."""
     user = update.message.from_user
-    answer = update.message.text
+    reply = update.message.text
 
-    current_index = context.user_data.get('current_question_index', 0)
     questions = context.user_data.get('questions', [])
-
-    if not questions or current_index >= len(questions):
+    if not questions:
         await update.message.reply_text("Hmm, something went wrong with the questions. Let's restart the CV process.")
-        logger.warning(f"User {user.id} in handle_question_answer but no questions/index out of bounds.")
-        # Potentially clear user_data related to questions
+        logger.warning(f"User {user.id} in handle_question_answer but no questions are stored.")
         return ASK_CV # Or ConversationHandler.END and ask to /start again
 
-    # Store the answer
-    # For simplicity, using the question itself as a key, or a generic "answer_X"
-    question_answered = questions[current_index]
-    context.user_data['answers'][f"answer_to_{current_index+1}_{question_answered[:20]}"] = answer
-    logger.info(f"User {user.id} answered Q{current_index+1} ('{question_answered[:30]}...') with: '{answer[:50]}...'")
+    answers = _split_answers(reply, len(questions))
+    if not any(answers):
+        await update.message.reply_text("I couldn't find any answers in that message. Please reply with one numbered answer per line.")
+        return ASK_QUESTIONS
 
-    current_index += 1
-    context.user_data['current_question_index'] = current_index
+    # Store the answers as a list aligned with the questions (None where a question wasn't answered)
+    context.user_data['answers'] = [answer or None for answer in answers]
+    logger.info("User %s answered %d of %d questions.", user.id, len(answers) - answers.count(""), len(questions))
 
-    if current_index < len(questions):
-        await update.message.reply_text(questions[current_index])
-        return ASK_QUESTIONS
-    else:
-        await update.message.reply_text("Thanks! That's all the questions I have for now.")
-        # All questions answered, process them
-        user_preferences = context.user_data.get('answers', {})
-        cv_analysis_data = context.user_data.get('cv_analysis', {})
-
-        # Simulate storing combined data
-        # In a real app, this would go to job_manager and then to data_storage
-        # combined_data = {"cv_analysis": cv_analysis_data, "preferences_via_questions": user_preferences}
-        # store_user_preferences(user.id, combined_data) # Placeholder
-        logger.info(f"All questions answered by user {user.id}. Preferences collected: {user_preferences}")
-
-        # For now, just confirm and end
-        await update.message.reply_text(
-            "I have your preferences. I'll start looking for suitable jobs soon! "
-            "(Job searching functionality is under development)."
-        )
-        # Clean up user_data for this conversation if desired
-        # for key in ['questions', 'answers', 'current_question_index', 'raw_cv_text', 'cv_analysis']:
-        #     context.user_data.pop(key, None)
-        return ConversationHandler.END
+    await update.message.reply_text("Thanks! That's all the questions I have for now.")
+    # All questions answered, process them
+    user_preferences = {
+        question: answer for question, answer in zip(questions, context.user_data['answers']) if answer is not None
+    }
+    cv_analysis_data = context.user_data.get('cv_analysis', {})
+
+    # Simulate storing combined data
+    # In a real app, this would go to job_manager and then to data_storage
+    # combined_data = {"cv_analysis": cv_analysis_data, "preferences_via_questions": user_preferences}
+    # store_user_preferences(user.id, combined_data) # Placeholder
+    logger.info("All questions answered by user %s. Preferences collected: %s", user.id, user_preferences)
+
+    # For now, just confirm and end
+    await update.message.reply_text(
+        "I have your preferences. I'll start looking for suitable jobs soon! "
+        "(Job searching functionality is under development)."
+    )
+    # Clean up user_data for this conversation if desired
+    # for key in ['questions', 'answers', 'cv_analysis']:
+    #     context.user_data.pop(key, None)
+    return ConversationHandler.END
+
+
+_NUMBERED_ANSWER_RE = re.compile(r"^\s*(\d+)\s*[.):-]\s*")
+
+def _split_answers(reply: str, n_questions: int) -> list[str]:
+    """
+    Splits a reply to the numbered questions into one answer per question ("" where none was given).
+    Lines starting with a number ("2. ...", "2) ...") answer that question, and unnumbered lines continue
+    the previous answer. If no line is numbered, the non-empty lines answer the questions in order.
+    """
+    answers = [""] * n_questions
+    lines = [line.strip() for line in reply.splitlines() if line.strip()]
+    if not any(_NUMBERED_ANSWER_RE.match(line) for line in lines):
+        for index, line in enumerate(lines[:n_questions]):
+            answers[index] = line
+        if len(lines) > n_questions: # Extra lines belong to the last answer
+            answers[-1] = " ".join(lines[n_questions - 1:])
+        return answers
+
+    index = None
+    for line in lines:
+        match = _NUMBERED_ANSWER_RE.match(line)
+        if match and 1 <= int(match.group(1)) <= n_questions:
+            index = int(match.group(1)) - 1
+            answers[index] = line[match.end():]
+        elif index is not None:
+            answers[index] = f"{answers[index]} {line}".strip()
+    return answers
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Displays help information."""
     user = update.message.from_user
-    logger.info(f"User {user.id} requested /help.")
+    logger.info("User %s requested /help.", user.id)
     await update.message.reply_text(
         "Here's how to use the AI Job Application Agent:\n"
         "- /start: Begin the process by uploading your CV.\n"
@@ -228,21 +343,22 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Cancels the current conversation."""
     user = update.message.from_user
-    logger.info(f"User {user.id} ({user.username}) cancelled the conversation with /cancel.")
+    logger.info("User %s (%s) cancelled the conversation with /cancel.", user.id, user.username)
     await update.message.reply_text(
         "Okay, the current operation has been cancelled. "
         "You can start over by sending /start anytime."
     )
     # Clean up user_data for this conversation
-    for key in ['questions', 'answers', 'current_question_index', 'raw_cv_text', 'cv_analysis']:
+    for key in ['questions', 'answers', 'raw_cv_text', 'cv_analysis']: # raw_cv_text: sessions from older versions
         context.user_data.pop(key, None)
     return ConversationHandler.END
 
 # --- Bot Setup and Control Functions ---
+_SHUTDOWN_TIMEOUT = 10 # Seconds allowed for each phase of shutdown_bot_async
 def setup_bot() -> Optional[Application]:
     """
     Builds and configures the Telegram Application instance with handlers.
-    Does not start polling.
+    Does not start receiving updates.
 
     Returns:
         Application: The configured PTB Application instance, or None if setup fails.
@@ -256,16 +372,42 @@ def setup_bot() -> Optional[Application]:
             # Or handle it here if run_bot is called standalone and exit.
             raise ConfigError("TELEGRAM_BOT_TOKEN is missing or not set in the configuration.")
 
-        application = ApplicationBuilder().token(bot_token).build()
+        # One connection pool serves all Bot API calls, including the CV downloads. CV downloads can take a
+        # while, hence the longer read timeout; a request waits at most pool_timeout for a free connection.
+        builder = (
+            ApplicationBuilder().token(bot_token).read_timeout(60).pool_timeout(10)
+            .connection_pool_size(getattr(config, 'TELEGRAM_CONNECTION_POOL_SIZE', 256))
+            # Updates are handled concurrently, so one user's CV analysis doesn't hold up everyone else's
+            # messages. True means PTB's default limit; an int sets the maximum number handled at once.
+            .concurrent_updates(getattr(config, 'TELEGRAM_CONCURRENT_UPDATES', True))
+        )
+        if h2 is not None: # HTTP/2 multiplexes concurrent requests over one connection per host
+            builder.http_version("2").get_updates_http_version("2")
+        if aiolimiter is not None:
+            # Queues outgoing Bot API calls within Telegram's flood limits (about 30 messages/s overall,
+            # 1/s per chat) instead of running into 429 errors under bursts, and retries those that still do.
+            builder.rate_limiter(AIORateLimiter(max_retries=3))
+        else:
+            logger.info("aiolimiter is not installed; Bot API calls are not rate limited.")
+        if getattr(config, 'TELEGRAM_PERSISTENCE_ENABLED', True):
+            # user_data and conversation states survive restarts, so users don't have to re-upload their CV
+            builder.persistence(SqlitePersistence())
+        application = builder.build()
 
         # Conversation Handler for CV submission and questions
         conv_handler = ConversationHandler(
             entry_points=[CommandHandler("start", start_command)],
             states={
-                ASK_CV: [MessageHandler(filters.ATTACHMENT | filters.Document.ALL, handle_cv_upload)],
+                ASK_CV: [
+                    MessageHandler(_CV_DOCUMENT_FILTER, handle_cv_upload),
+                    # Anything else is rejected right away, without downloading it
+                    MessageHandler(~filters.COMMAND, reject_unsupported_upload),
+                ],
                 ASK_QUESTIONS: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_question_answer)],
             },
             fallbacks=[CommandHandler("cancel", cancel_command), CommandHandler("help", help_command)],
+            name="cv_onboarding",
+            persistent=application.persistence is not None,
         )
 
         application.add_handler(conv_handler)
@@ -284,7 +426,9 @@ def setup_bot() -> Optional[Application]:
 
 async def start_bot_async(application: Application) -> None:
     """
-    Initializes, starts the application, and begins polling.
+    Initializes, starts the application, and begins receiving updates: by webhook if TELEGRAM_WEBHOOK_URL is
+    set in config.py (Telegram pushes each update as it arrives), otherwise by polling (for development, or
+    hosts that can't accept incoming HTTPS). Returns once updates are being received.
     Args:
         application (Application): The configured PTB Application instance.
     """
@@ -292,30 +436,59 @@ async def start_bot_async(application: Application) -> None:
         logger.error("Application object is None, cannot start bot.")
         return
 
-    logger.info("Starting bot polling (asynchronously)...")
+    # Configure the LLM client once here, so handlers don't have to check on every update. Best effort, as in
+    # main.py: the bot still starts without it, and each LLM call retries the configuration; handle_cv_upload
+    # tells the user if that fails too.
     try:
+        await ensure_llm_client_configured()
+    except (ConfigError, LLMInterfaceError) as e:
+        logger.error(f"LLM client not configured at startup: {e}. LLM features will fail until it is fixed.")
+
+    logger.info("Starting bot (asynchronously)...")
+    try:
+        # The order run_polling()/run_webhook() use in PTB v20: initialize, start receiving updates, then start
+        # processing them. Updater.start_polling/start_webhook are coroutines that start a polling task or web
+        # server on this event loop (no extra thread) and return; the caller keeps the loop running.
         await application.initialize()
-        await application.start()
-        # updater.start_polling is a blocking call that runs in its own thread.
-        # It's not an awaitable, so we don't await it directly in the typical async/await sense.
-        # The Application's start() method typically handles the updater lifecycle.
-        # If we need to start polling explicitly on the updater (e.g. for drop_pending_updates):
         if application.updater:
-            application.updater.start_polling(drop_pending_updates=True)
-            logger.info("Bot updater started polling for new updates.")
+            await _start_receiving_updates(application.updater)
         else:
-            logger.warning("Application updater not found. Polling might not have started as expected.")
-
-        # Keep this function alive if it's the main task for polling,
-        # or ensure main.py keeps the event loop running.
-        # For now, assuming polling runs in background threads managed by PTB.
-        logger.info("Bot has started and is now polling.")
+            logger.warning("Application updater not found. Updates might not be received as expected.")
+        await application.start()
+        logger.info("Bot has started and is now receiving updates.")
 
+    except InvalidToken as e:
+        # The token passed setup_bot's placeholder check but Telegram rejected it (checked in initialize())
+        logger.critical(f"Telegram rejected the bot token: {e}")
+        await shutdown_bot_async(application)
+        raise ConfigError("TELEGRAM_BOT_TOKEN was rejected by Telegram. Check the token in config.py.") from e
     except Exception as e:
-        logger.critical(f"An error occurred while starting bot polling: {e}", exc_info=True)
+        logger.critical(f"An error occurred while starting the bot: {e}", exc_info=True)
         # Potentially try to shut down if partially started
         await shutdown_bot_async(application) # Attempt graceful shutdown
-        raise TelegramBotError(f"Failed to start bot polling: {e}") from e
+        raise TelegramBotError(f"Failed to start the bot: {e}") from e
+
+
+async def _start_receiving_updates(updater) -> None:
+    """Starts the updater's webhook server if TELEGRAM_WEBHOOK_URL is configured, else its polling task."""
+    webhook_url = getattr(config, 'TELEGRAM_WEBHOOK_URL', None)
+    if not webhook_url:
+        await updater.start_polling(drop_pending_updates=True)
+        logger.info("Bot updater started polling for new updates.")
+        return
+    # The updater's own web server listens for Telegram's POSTs (needs python-telegram-bot[webhooks]). TLS is
+    # usually terminated by a reverse proxy in front of it, which forwards webhook_url to listen:port/url_path.
+    url_path = getattr(config, 'TELEGRAM_WEBHOOK_PATH', "telegram-webhook")
+    await updater.start_webhook(
+        listen=getattr(config, 'TELEGRAM_WEBHOOK_LISTEN', "0.0.0.0"),
+        port=getattr(config, 'TELEGRAM_WEBHOOK_PORT', 8443),
+        url_path=url_path,
+        webhook_url=f"{webhook_url.rstrip('/')}/{url_path}",
+        # Telegram sends this back in a header with every update, so requests from anyone else are rejected
+        secret_token=getattr(config, 'TELEGRAM_WEBHOOK_SECRET', None),
+        drop_pending_updates=True
+    )
+    logger.info("Bot updater is receiving updates by webhook at %s.", webhook_url)
 
 
 async def shutdown_bot_async(application: Application) -> None:
@@ -330,30 +503,46 @@ async def shutdown_bot_async(application: Application) -> None:
 
     logger.info("Attempting to shut down the Telegram bot...")
     try:
+        # Stopping the updater (no new updates) and the application (finish processing) are independent,
+        # so they run concurrently; each teardown phase is bounded so one stuck component can't hang shutdown.
+        stop_steps = []
         if application.updater and application.updater.running:
-            logger.info("Stopping updater polling...")
-            application.updater.stop() # This is synchronous
-            logger.info("Updater polling stopped.")
-
+            logger.info("Stopping updater...")
+            stop_steps.append(application.updater.stop())
         if application.running: # PTB v20 check
             logger.info("Stopping application...")
-            await application.stop()
-            logger.info("Application stopped.")
+            stop_steps.append(application.stop())
+        if stop_steps:
+            try:
+                results = await asyncio.wait_for(asyncio.gather(*stop_steps, return_exceptions=True), _SHUTDOWN_TIMEOUT)
+                for result in results:
+                    if isinstance(result, Exception):
+                        logger.error(f"Error while stopping the bot: {result}", exc_info=result)
+                logger.info("Updater and application stopped.")
+            except asyncio.TimeoutError:
+                logger.error(f"Stopping the bot took longer than {_SHUTDOWN_TIMEOUT}s; shutting down anyway.")
 
         logger.info("Shutting down application...")
-        await application.shutdown()
+        await asyncio.wait_for(application.shutdown(), _SHUTDOWN_TIMEOUT)
         logger.info("Telegram bot application shut down successfully.")
 
     except Exception as e:
         logger.error(f"An error occurred during bot shutdown: {e}", exc_info=True)
         # Even if errors occur, it's usually best to let it try to complete.
+    finally:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False, cancel_futures=True)
+        try:
+            await close_http_client()
+        except Exception as e:
+            logger.error(f"Error closing the shared HTTP client: {e}", exc_info=True)
 
 
 # Old run_bot function is removed.
 
 if __name__ == '__main__':
     import logging
-    import asyncio
+    import signal
 
     # Basic logging setup for standalone testing
     logging.basicConfig(
@@ -381,9 +570,16 @@ if __name__ == '__main__':
                 await start_bot_async(application)
 
                 logger.info("Bot should be running. Press Ctrl+C to stop.")
-                # Keep the test running until interrupted
-                while True:
-                    await asyncio.sleep(5) # Check for interrupt every 5s
+                # Sleep until SIGINT/SIGTERM rather than waking up periodically to check
+                stop_event = asyncio.Event()
+                loop = asyncio.get_running_loop()
+                for sig in (signal.SIGINT, signal.SIGTERM):
+                    try:
+                        loop.add_signal_handler(sig, stop_event.set)
+                    except NotImplementedError: # Windows: Ctrl+C still arrives as KeyboardInterrupt
+                        pass
+                await stop_event.wait()
+                logger.info("Stop signal received.")
             else:
                 logger.error("Failed to setup bot for standalone test. Application is None.")
 
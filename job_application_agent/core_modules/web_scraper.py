@@ -2,101 +2,16 @@ import time
 import urllib.parse # Added for URL encoding
 from typing import List, Dict, Optional, Any
 
+import httpx
 from crawl4ai import Crawl4ai # Added crawl4ai import
-
-# Commented out Selenium imports
-# from selenium import webdriver
-# from selenium.webdriver.common.by import By
-# from selenium.webdriver.chrome.service import Service as ChromeService
-# from selenium.webdriver.firefox.service import Service as FirefoxService
-# # from selenium.webdriver.edge.service import Service as EdgeService # Example for Edge
-# from selenium.webdriver.support.ui import WebDriverWait
-# from selenium.webdriver.support import expected_conditions as EC
-# from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+from selectolax.parser import HTMLParser
 
 from job_application_agent import config
 from job_application_agent.core_modules.error_handler import WebScraperError, ConfigError, get_logger
+from job_application_agent.core_modules.http_client import get_http_client, close_http_client
 
 logger = get_logger(__name__)
 
-# _driver_instance: Optional[webdriver.Remote] = None # Commented out Selenium global driver instance
-
-# Commented out Selenium get_webdriver function
-# def get_webdriver(browser: str = "chrome", headless: bool = True) -> webdriver.Remote:
-#     """
-#     Initializes and returns a Selenium WebDriver instance.
-#
-#     Args:
-#         browser (str): The browser to use ('chrome', 'firefox'). Default is 'chrome'.
-#         headless (bool): Whether to run the browser in headless mode. Default is True.
-#
-#     Returns:
-#         webdriver.Remote: The initialized Selenium WebDriver instance.
-#
-#     Raises:
-#         ConfigError: If SELENIUM_WEBDRIVER_PATH is specified but invalid.
-#         WebScraperError: If WebDriver fails to initialize for other reasons.
-#     """
-#     global _driver_instance
-#     # For simplicity in this phase, we are not reusing _driver_instance globally.
-#     # Each call to get_webdriver() will create a new instance.
-#     # Proper driver lifecycle management (e.g. a singleton or context manager)
-#     # would be needed for more advanced scenarios.
-#
-#     driver_path = getattr(config, 'SELENIUM_WEBDRIVER_PATH', "")
-#     service_instance = None
-#
-#     options: Optional[webdriver.ChromeOptions | webdriver.FirefoxOptions] = None
-#
-#     logger.info(f"Attempting to initialize {browser} WebDriver. Headless: {headless}")
-#     logger.debug(f"Configured WebDriver path: '{driver_path if driver_path else 'Not set, using PATH'}'")
-#
-#     try:
-#         if browser.lower() == "chrome":
-#             options = webdriver.ChromeOptions()
-#             if headless:
-#                 options.add_argument("--headless")
-#             options.add_argument("--disable-gpu") # Recommended for headless
-#             options.add_argument("--window-size=1920,1080") # Specify window size
-#             options.add_argument("--no-sandbox") #Bypass OS security model, V.IMP
-#             options.add_argument("--disable-dev-shm-usage") #overcome limited resource problems
-#
-#             if driver_path:
-#                 service_instance = ChromeService(executable_path=driver_path)
-#                 driver = webdriver.Chrome(service=service_instance, options=options)
-#             else: # Assumes chromedriver is in PATH
-#                 driver = webdriver.Chrome(options=options)
-#
-#         elif browser.lower() == "firefox":
-#             options = webdriver.FirefoxOptions()
-#             if headless:
-#                 options.add_argument("--headless")
-#             options.add_argument("--disable-gpu")
-#             options.add_argument("--window-size=1920,1080")
-#
-#             if driver_path:
-#                 service_instance = FirefoxService(executable_path=driver_path)
-#                 driver = webdriver.Firefox(service=service_instance, options=options)
-#             else: # Assumes geckodriver is in PATH
-#                 driver = webdriver.Firefox(options=options)
-#         else:
-#             raise WebScraperError(f"Unsupported browser: {browser}. Supported browsers are 'chrome', 'firefox'.")
-#
-#         logger.info(f"{browser.capitalize()} WebDriver initialized successfully.")
-#         return driver
-#
-#     except WebDriverException as e:
-#         logger.error(f"Failed to initialize Selenium WebDriver for {browser}: {e}", exc_info=True)
-#         if "executable needs to be in PATH" in str(e) or "Service " in str(e) and "not found" in str(e):
-#             raise ConfigError(
-#                 f"WebDriver executable for {browser} not found. "
-#                 f"Ensure it's in your system PATH or SELENIUM_WEBDRIVER_PATH ('{driver_path}') in config.py is correct."
-#             ) from e
-#         raise WebScraperError(f"Failed to initialize Selenium WebDriver for {browser}: {e}")
-#     except Exception as e: # Catch any other unexpected error during setup
-#         logger.error(f"An unexpected error occurred during WebDriver setup for {browser}: {e}", exc_info=True)
-#         raise WebScraperError(f"Unexpected error setting up WebDriver for {browser}: {e}")
-
 def init_crawl4ai_crawler() -> Crawl4ai:
     """
     Initializes and returns a Crawl4ai crawler instance.
@@ -113,114 +28,15 @@ def init_crawl4ai_crawler() -> Crawl4ai:
         raise WebScraperError(f"Could not initialize Crawl4ai crawler: {e}")
 
 
-# Commented out Selenium _click_element_when_ready function
-# def _click_element_when_ready(driver: webdriver.Remote, by: By, value: str, timeout: int = 10):
-#     """Waits for an element to be clickable and then clicks it."""
-#     try:
-#         element = WebDriverWait(driver, timeout).until(
-#             EC.element_to_be_clickable((by, value))
-#         )
-#         element.click()
-#         logger.debug(f"Clicked element located by {by}='{value}'")
-#     except TimeoutException:
-#         logger.error(f"Timeout waiting for element to be clickable: {by}='{value}'")
-#         raise WebScraperError(f"Element not clickable after {timeout}s: {by}='{value}'")
-#     except Exception as e:
-#         logger.error(f"Error clicking element {by}='{value}': {e}", exc_info=True)
-#         raise WebScraperError(f"Could not click element {by}='{value}': {e}")
-
-def search_jobs_fake_python_static_site(job_title_keywords: Optional[List[str]] = None, location_keywords: Optional[List[str]] = None) -> List[Dict[str, str]]:
-    """
-    Searches for jobs on the 'https://realpython.github.io/fake-jobs/' static site using Crawl4ai.
-
-    Args:
-        browser (str): The browser to use ('chrome', 'firefox'). Default is 'chrome'.
-        headless (bool): Whether to run the browser in headless mode. Default is True.
-
-    Returns:
-        webdriver.Remote: The initialized Selenium WebDriver instance.
-
-    Raises:
-        ConfigError: If SELENIUM_WEBDRIVER_PATH is specified but invalid.
-        WebScraperError: If WebDriver fails to initialize for other reasons.
-    """
-    global _driver_instance
-    # For simplicity in this phase, we are not reusing _driver_instance globally.
-    # Each call to get_webdriver() will create a new instance.
-    # Proper driver lifecycle management (e.g. a singleton or context manager)
-    # would be needed for more advanced scenarios.
-
-    driver_path = getattr(config, 'SELENIUM_WEBDRIVER_PATH', "")
-    service_instance = None
-
-    options: Optional[webdriver.ChromeOptions | webdriver.FirefoxOptions] = None
+# --- Static Site Scraping (plain HTTP + selectolax) ---
+# Static pages need neither a browser nor Crawl4ai: one GET and a C-parsed DOM walk is all it takes.
+def _node_text(node: Any, selector: str) -> str:
+    """Stripped text of the first element under node matching selector, or '' if there is none."""
+    match = node.css_first(selector)
+    return match.text(strip=True) if match is not None else ""
 
-    logger.info(f"Attempting to initialize {browser} WebDriver. Headless: {headless}")
-    logger.debug(f"Configured WebDriver path: '{driver_path if driver_path else 'Not set, using PATH'}'")
-
-    try:
-        if browser.lower() == "chrome":
-            options = webdriver.ChromeOptions()
-            if headless:
-                options.add_argument("--headless")
-            options.add_argument("--disable-gpu") # Recommended for headless
-            options.add_argument("--window-size=1920,1080") # Specify window size
-            options.add_argument("--no-sandbox") #Bypass OS security model, V.IMP
-            options.add_argument("--disable-dev-shm-usage") #overcome limited resource problems
-
-            if driver_path:
-                service_instance = ChromeService(executable_path=driver_path)
-                driver = webdriver.Chrome(service=service_instance, options=options)
-            else: # Assumes chromedriver is in PATH
-                driver = webdriver.Chrome(options=options)
-
-        elif browser.lower() == "firefox":
-            options = webdriver.FirefoxOptions()
-            if headless:
-                options.add_argument("--headless")
-            options.add_argument("--disable-gpu")
-            options.add_argument("--window-size=1920,1080")
-
-            if driver_path:
-                service_instance = FirefoxService(executable_path=driver_path)
-                driver = webdriver.Firefox(service=service_instance, options=options)
-            else: # Assumes geckodriver is in PATH
-                driver = webdriver.Firefox(options=options)
-        else:
-            raise WebScraperError(f"Unsupported browser: {browser}. Supported browsers are 'chrome', 'firefox'.")
-
-        logger.info(f"{browser.capitalize()} WebDriver initialized successfully.")
-        return driver
-
-    except WebDriverException as e:
-        logger.error(f"Failed to initialize Selenium WebDriver for {browser}: {e}", exc_info=True)
-        if "executable needs to be in PATH" in str(e) or "Service " in str(e) and "not found" in str(e):
-            raise ConfigError(
-                f"WebDriver executable for {browser} not found. "
-                f"Ensure it's in your system PATH or SELENIUM_WEBDRIVER_PATH ('{driver_path}') in config.py is correct."
-            ) from e
-        raise WebScraperError(f"Failed to initialize Selenium WebDriver for {browser}: {e}")
-    except Exception as e: # Catch any other unexpected error during setup
-        logger.error(f"An unexpected error occurred during WebDriver setup for {browser}: {e}", exc_info=True)
-        raise WebScraperError(f"Unexpected error setting up WebDriver for {browser}: {e}")
-
-
-def _click_element_when_ready(driver: webdriver.Remote, by: By, value: str, timeout: int = 10):
-    """Waits for an element to be clickable and then clicks it."""
-    try:
-        element = WebDriverWait(driver, timeout).until(
-            EC.element_to_be_clickable((by, value))
-        )
-        element.click()
-        logger.debug(f"Clicked element located by {by}='{value}'")
-    except TimeoutException:
-        logger.error(f"Timeout waiting for element to be clickable: {by}='{value}'")
-        raise WebScraperError(f"Element not clickable after {timeout}s: {by}='{value}'")
-    except Exception as e:
-        logger.error(f"Error clicking element {by}='{value}': {e}", exc_info=True)
-        raise WebScraperError(f"Could not click element {by}='{value}': {e}")
 
-def search_jobs_fake_python_static_site(job_title_keywords: Optional[List[str]] = None, location_keywords: Optional[List[str]] = None) -> List[Dict[str, str]]:
+async def search_jobs_fake_python_static_site(job_title_keywords: Optional[List[str]] = None, location_keywords: Optional[List[str]] = None) -> List[Dict[str, str]]:
     """
     Searches for jobs on the 'https://realpython.github.io/fake-jobs/' static site.
 
@@ -231,66 +47,31 @@ def search_jobs_fake_python_static_site(job_title_keywords: Optional[List[str]]
     Returns:
         List[Dict[str, str]]: A list of job dictionaries, each containing
         'title', 'company', 'location', 'description_snippet', and 'url' (which will be the main site URL for all jobs on this fake site).
+
+    Raises:
+        WebScraperError: If the page cannot be fetched or parsed.
     """
     target_url = "https://realpython.github.io/fake-jobs/"
-    logger.info(f"Starting job search on Fake Python Jobs site using Crawl4ai: {target_url}")
+    logger.info(f"Starting job search on Fake Python Jobs site: {target_url}")
 
     jobs_found: List[Dict[str, str]] = []
-    crawler = init_crawl4ai_crawler()
-
-    # Define the structure for Crawl4ai to extract data
-    # Based on the previous Selenium selectors:
-    # - Job cards: `div.card-content`
-    # - Title: `h2.title.is-5`
-    # - Company: `h3.subtitle.is-6.company`
-    # - Location: `p.location`
-    # - Description: `div.content > p` (first p)
-    extraction_schema = {
-        "jobs": {
-            "selector": "div.card-content",
-            "type": "list",
-            "schema": {
-                "title": {"selector": "h2.title.is-5", "type": "text"},
-                "company": {"selector": "h3.subtitle.is-6.company", "type": "text"},
-                "location": {"selector": "p.location", "type": "text"},
-                # For description, Crawl4ai might need a more specific selector or post-processing
-                # if it grabs all <p> tags within div.content.
-                # Let's assume it gets the first one or we can process it.
-                "description_raw": {"selector": "div.content p", "type": "text"},
-            }
-        }
-    }
-
     try:
-        logger.debug(f"Running Crawl4ai on {target_url} with schema.")
-        # output = crawler.run(url=target_url, parser_config={"schema": extraction_schema}) # Older API
-        # Assuming the new API is crawler.crawl(url=target_url, output_format="json", extraction_schema=extraction_schema)
-        # Or crawler.run(url=target_url, extraction_schema=extraction_schema)
-        # For now, let's assume crawler.run() is the method and it returns a dictionary
-        # with a 'data' key containing the extracted information.
-        # The exact API usage might need to be verified from crawl4ai documentation.
-        # For the purpose of this example, let's simulate a successful run
-        # result = crawler.run(url=target_url, extraction_schema=extraction_schema) # Placeholder for actual crawl4ai call
-
-        # Let's try to use the direct crawl method if available and parse its output
-        # This is a guess based on common patterns, actual API might differ.
-        crawler_output = crawler.crawl(url=target_url, extraction_schema=extraction_schema)
+        response = await get_http_client().get(target_url)
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        logger.error(f"Failed to fetch {target_url}: {e}", exc_info=True)
+        raise WebScraperError(f"Error fetching {target_url}: {e}")
 
-        # Check if crawler_output has the expected structure
-        if not crawler_output or 'extracted_data' not in crawler_output or 'jobs' not in crawler_output['extracted_data']:
-            logger.warning(f"Crawl4ai did not return the expected data structure for {target_url}. Output: {crawler_output}")
-            return []
-
-        extracted_jobs = crawler_output['extracted_data']['jobs']
-        logger.info(f"Crawl4ai extracted {len(extracted_jobs)} job items from the page.")
+    try:
+        tree = HTMLParser(response.text)
+        cards = tree.css("div.card-content")
+        logger.info(f"Found {len(cards)} job cards on the page.")
 
-        for job_data in extracted_jobs:
-            title = job_data.get("title", "").strip()
-            company = job_data.get("company", "").strip()
-            location = job_data.get("location", "").strip()
-            # Assuming description_raw contains the text from the first <p>
-            # If it's a list or combined text, adjustments might be needed.
-            description_snippet = job_data.get("description_raw", "").strip()[:200] + "..."
+        for card in cards:
+            title = _node_text(card, "h2.title.is-5")
+            company = _node_text(card, "h3.subtitle.is-6.company")
+            location = _node_text(card, "p.location")
+            description_snippet = _node_text(card, "div.content p")[:200] + "..."
 
             # Filtering
             title_match = True
@@ -309,16 +90,15 @@ def search_jobs_fake_python_static_site(job_title_keywords: Optional[List[str]]
                     "description_snippet": description_snippet,
                     "url": target_url # This site doesn't have individual job URLs
                 })
-                logger.debug(f"Matched job: {title} at {company} in {location}")
+                logger.debug("Matched job: %s at %s in %s", title, company, location)
 
-        logger.info(f"Found {len(jobs_found)} jobs matching criteria on {target_url} using Crawl4ai.")
+        logger.info(f"Found {len(jobs_found)} jobs matching criteria on {target_url}.")
         return jobs_found
 
-    except Exception as e: # Catch any exception from Crawl4ai or processing
-        logger.error(f"An error occurred while scraping {target_url} with Crawl4ai: {e}", exc_info=True)
-        # Consider if crawl4ai has specific exceptions to catch
-        raise WebScraperError(f"Error scraping {target_url} with Crawl4ai: {e}")
-    # No finally block to quit driver as Crawl4ai manages its own resources or doesn't need explicit closing in this context.
+    except Exception as e:
+        logger.error(f"An error occurred while parsing {target_url}: {e}", exc_info=True)
+        raise WebScraperError(f"Error parsing {target_url}: {e}")
+
 
 # --- LinkedIn Job Search Implementation ---
 def search_jobs_linkedin(job_title: str, location: str) -> List[Dict[str, str]]:
@@ -579,6 +359,7 @@ def apply_for_job_on_site(job_url: str, user_profile: Dict[str, Any]) -> bool:
 
 # --- Example Usage (for testing) ---
 if __name__ == '__main__':
+    import asyncio
     import logging # Import logging for standalone testing
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s')
 
@@ -596,41 +377,43 @@ if __name__ == '__main__':
         can_test_crawl4ai = False
 
 
-    # Test scraping the fake jobs site using Crawl4ai
-    if can_test_crawl4ai:
-        logger.info("\n--- Testing search_jobs_fake_python_static_site with Crawl4ai ---")
+    # Test scraping the fake jobs site (plain HTTP; does not need Crawl4ai)
+    async def fake_site_test():
+        logger.info("\n--- Testing search_jobs_fake_python_static_site ---")
         try:
             # Example 1: No keywords (get all jobs)
-            all_jobs = search_jobs_fake_python_static_site()
-            logger.info(f"Found {len(all_jobs)} total jobs on fake site with Crawl4ai.")
+            all_jobs = await search_jobs_fake_python_static_site()
+            logger.info(f"Found {len(all_jobs)} total jobs on fake site.")
             if all_jobs:
                 logger.info(f"First few jobs (no filter):")
                 for i, job in enumerate(all_jobs[:3]):
                     logger.info(f"  {i+1}. {job['title']} at {job['company']} in {job['location']}")
             else:
-                logger.info("No jobs found on fake site with Crawl4ai (no filter). This might indicate an issue if jobs are expected.")
+                logger.info("No jobs found on fake site (no filter). This might indicate an issue if jobs are expected.")
 
 
             # Example 2: With keywords
             logger.info("\nSearching for 'Python Developer' jobs in 'Remote' locations (expecting few/none on this fake site)...")
-            filtered_jobs = search_jobs_fake_python_static_site(
+            filtered_jobs = await search_jobs_fake_python_static_site(
                 job_title_keywords=["Python Developer", "Engineer"],
                 location_keywords=["Remote", "New York"] # This site has "Remote"
             )
-            logger.info(f"Found {len(filtered_jobs)} jobs matching title/location keywords with Crawl4ai.")
+            logger.info(f"Found {len(filtered_jobs)} jobs matching title/location keywords.")
             if filtered_jobs:
                 logger.info("Filtered jobs found:")
                 for job in filtered_jobs:
                     logger.info(f"  - {job['title']} at {job['company']} in {job['location']}")
             else:
-                logger.info("No jobs found matching the specific title/location keywords on the fake site with Crawl4ai.")
+                logger.info("No jobs found matching the specific title/location keywords on the fake site.")
 
         except WebScraperError as e:
-            logger.error(f"WebScraperError during fake site test with Crawl4ai: {e}")
+            logger.error(f"WebScraperError during fake site test: {e}")
         except Exception as e:
-            logger.error(f"Unexpected error during fake site test with Crawl4ai: {e}", exc_info=True)
-    else:
-        logger.warning("Crawl4ai was not successfully initialized, so live scraping tests were skipped.")
+            logger.error(f"Unexpected error during fake site test: {e}", exc_info=True)
+        finally:
+            await close_http_client()
+
+    asyncio.run(fake_site_test())
 
 
     logger.info("\n--- Testing placeholder functions ---")
@@ -3,8 +3,14 @@
 
 import hashlib
 import datetime
+import json
 import re
 
+try:
+    import orjson # Rust-backed JSON; optional, the stdlib json module is the fallback
+except ImportError:
+    orjson = None
+
 def generate_unique_id(data_string: str) -> str:
     """
     Generates a SHA256 hash for a given string to produce a unique ID.
@@ -64,6 +70,50 @@ def clean_text(text: str) -> str:
 
     return cleaned_text
 
+def json_dumps(obj, pretty: bool = False, sort_keys: bool = False) -> bytes:
+    """
+    Serializes obj to UTF-8 JSON bytes, using orjson when it is installed.
+
+    Args:
+        obj: The object to serialize (dicts, lists, str, numbers, bool, None).
+        pretty (bool, optional): Indent by 2 spaces for human-readable files.
+                                 Defaults to False (compact, no whitespace).
+        sort_keys (bool, optional): Sort dict keys, so equal dicts always serialize to the same bytes.
+                                    Defaults to False (insertion order).
+
+    Returns:
+        bytes: The UTF-8 encoded JSON document.
+
+    Raises:
+        TypeError: If obj contains a value that isn't JSON serializable.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, option=option)
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False, sort_keys=sort_keys).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, sort_keys=sort_keys).encode('utf-8')
+
+def json_loads(data):
+    """
+    Parses a JSON document from bytes or str, using orjson when it is installed.
+
+    Args:
+        data (bytes, str or bytes-like): The JSON document. A memoryview (e.g. over an mmap) is parsed
+                                         in place by orjson, without copying it into a bytes object first.
+
+    Returns:
+        The parsed object.
+
+    Raises:
+        json.JSONDecodeError: If data is not valid JSON (orjson's error is a subclass of it).
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if not isinstance(data, (str, bytes, bytearray)):
+        data = bytes(data) # The json module only takes str, bytes and bytearray
+    return json.loads(data)
+
 # --- Example Usage (for testing) ---
 if __name__ == '__main__':
     print("--- Utils Standalone Test ---")
@@ -131,5 +181,11 @@ if __name__ == '__main__':
     print(f"Original: {text_none}\nCleanedNone: '{cleaned_none}'")
     assert cleaned_none == ""
 
+    # Test json_dumps / json_loads
+    sample = {"title": "Développeur", "skills": ["Python", "AI"], "years": 5}
+    assert json_loads(json_dumps(sample)) == sample
+    assert json_loads(json_dumps(sample, pretty=True).decode('utf-8')) == sample
+    print(f"JSON round trip ({'orjson' if orjson is not None else 'json'}): {json_dumps(sample)!r}")
+
 
     print("\n--- Utils Standalone Test Complete ---")